@@ -1,6 +1,92 @@
 // Bot AI Logic for Kaataq Game
 // Handles decision-making for AI players with different difficulty levels
 
+// Running pattern statistics over a room's gameHistory, updated once per
+// resolved round so bot decisions never rescan the history
+class PatternStats {
+    constructor(recentWindow = 3) {
+        this.recentWindow = recentWindow;
+        this.reset();
+    }
+
+    reset() {
+        this.rounds = 0;
+        this.nextIndex = 0; // next gameHistory index to record
+        this.lastKey = null;
+        this.recent = []; // last few stick choices by any holder
+        this.holders = new Map();
+    }
+
+    static entryKey(entry) {
+        return `${entry.round}:${entry.timestamp}`;
+    }
+
+    // Catch up with a history array, recording only the new rounds. A
+    // shorter history or a different last entry means a reset or a new
+    // room, so the stats are rebuilt from scratch. Holes are rounds already
+    // archived out of the room and are skipped.
+    sync(gameHistory) {
+        const last = this.nextIndex > 0 ? gameHistory[this.nextIndex - 1] : null;
+        if (gameHistory.length < this.nextIndex ||
+            (last && PatternStats.entryKey(last) !== this.lastKey)) {
+            this.reset();
+        }
+        for (let index = this.nextIndex; index < gameHistory.length; index++) {
+            if (gameHistory[index]) this.record(gameHistory[index]);
+        }
+        this.nextIndex = gameHistory.length;
+    }
+
+    record(entry) {
+        const choice = entry.stickChoice;
+        this.rounds++;
+        this.lastKey = PatternStats.entryKey(entry);
+        this.recent.push(choice);
+        if (this.recent.length > this.recentWindow) this.recent.shift();
+
+        let stats = this.holders.get(entry.holderId);
+        if (!stats) {
+            stats = {
+                total: 0, left: 0, right: 0, switches: 0,
+                last: null, previous: null,
+                transitions: {}, // 'left>right' and 'left,right>left' counts
+            };
+            this.holders.set(entry.holderId, stats);
+        }
+        if (stats.last) {
+            if (stats.last !== choice) stats.switches++;
+            const bigram = `${stats.last}>${choice}`;
+            stats.transitions[bigram] = (stats.transitions[bigram] || 0) + 1;
+            if (stats.previous) {
+                const trigram = `${stats.previous},${stats.last}>${choice}`;
+                stats.transitions[trigram] = (stats.transitions[trigram] || 0) + 1;
+            }
+        }
+        stats.total++;
+        if (choice === 'left') stats.left++;
+        else if (choice === 'right') stats.right++;
+        stats.previous = stats.last;
+        stats.last = choice;
+    }
+
+    holder(holderId) {
+        return this.holders.get(holderId) || PatternStats.EMPTY;
+    }
+
+    switchRate(holderId) {
+        const stats = this.holder(holderId);
+        return stats.total > 1 ? stats.switches / (stats.total - 1) : 0;
+    }
+
+    recentCounts() {
+        const left = this.recent.filter(choice => choice === 'left').length;
+        return { left: left, right: this.recent.length - left };
+    }
+}
+PatternStats.EMPTY = Object.freeze({
+    total: 0, left: 0, right: 0, switches: 0, last: null, previous: null, transitions: {}
+});
+
 class BotAI {
     constructor() {
         this.botNames = [
@@ -9,6 +95,7 @@ class BotAI {
         ];
         this.usedNames = new Set();
         this.difficulties = ['easy', 'medium', 'hard'];
+        this.stats = new PatternStats();
     }
 
     // Generate a unique bot player object
@@ -72,80 +159,90 @@ class BotAI {
         return personalities[difficulty];
     }
 
+    // Rooms in the compact schema store only the difficulty
+    personalityOf(botPlayer) {
+        return botPlayer.botPersonality || this.generatePersonality(botPlayer.botDifficulty);
+    }
+
+    // Simulated thinking time in milliseconds
+    thinkTime(botPlayer) {
+        const reactionTime = this.personalityOf(botPlayer).reactionTime;
+        return Math.random() * (reactionTime.max - reactionTime.min) + reactionTime.min;
+    }
+
     // Bot decides which hand to hide the stick in (as holder)
+    chooseStick(botPlayer, gameHistory = []) {
+        const personality = this.personalityOf(botPlayer);
+        this.stats.sync(gameHistory);
+
+        if (Math.random() < personality.consistency) {
+            // Use strategy based on difficulty
+            if (botPlayer.botDifficulty === 'hard') {
+                return this.makeStrategicStickChoice();
+            } else if (botPlayer.botDifficulty === 'medium') {
+                return this.makeMediumStickChoice();
+            }
+        }
+        // Random choice (easy bots, or inconsistency)
+        return Math.random() < 0.5 ? 'left' : 'right';
+    }
+
+    // Bot makes a guess about which hand holds the stick
+    chooseGuess(botPlayer, holderPlayer, gameHistory = [], currentVotes = {}) {
+        const personality = this.personalityOf(botPlayer);
+        this.stats.sync(gameHistory);
+
+        if (Math.random() < personality.smartGuessChance) {
+            // Use strategy based on difficulty
+            if (botPlayer.botDifficulty === 'hard') {
+                return this.makeStrategicGuess(holderPlayer, currentVotes);
+            } else if (botPlayer.botDifficulty === 'medium') {
+                return this.makeMediumGuess(holderPlayer, currentVotes);
+            }
+        }
+        // Random guess
+        return Math.random() < 0.5 ? 'left' : 'right';
+    }
+
+    // Every bot's vote for a phase in one pass. Bots vote in a random order
+    // and each sees the votes before it, as if they had voted one by one.
+    chooseVotes(bots, holderPlayer, gameHistory = [], currentVotes = {}) {
+        const votes = Object.assign({}, currentVotes);
+        const order = bots.slice();
+        for (let i = order.length - 1; i > 0; i--) {
+            const j = Math.floor(Math.random() * (i + 1));
+            [order[i], order[j]] = [order[j], order[i]];
+        }
+        const guesses = {};
+        order.forEach(bot => {
+            guesses[bot.id] = this.chooseGuess(bot, holderPlayer, gameHistory, votes);
+            votes[bot.id] = guesses[bot.id];
+        });
+        return guesses;
+    }
+
+    // Promise versions with the thinking time built in
     makeStickChoice(botPlayer, gameHistory = []) {
-        const personality = botPlayer.botPersonality;
-        
         return new Promise((resolve) => {
-            // Simulate thinking time
-            const thinkTime = Math.random() * 
-                (personality.reactionTime.max - personality.reactionTime.min) + 
-                personality.reactionTime.min;
-            
-            setTimeout(() => {
-                let choice;
-                
-                if (Math.random() < personality.consistency) {
-                    // Use strategy based on difficulty
-                    if (botPlayer.botDifficulty === 'hard') {
-                        choice = this.makeStrategicStickChoice(gameHistory);
-                    } else if (botPlayer.botDifficulty === 'medium') {
-                        choice = this.makeMediumStickChoice(gameHistory);
-                    } else {
-                        choice = Math.random() < 0.5 ? 'left' : 'right';
-                    }
-                } else {
-                    // Random choice (inconsistency)
-                    choice = Math.random() < 0.5 ? 'left' : 'right';
-                }
-                
-                resolve(choice);
-            }, thinkTime);
+            setTimeout(() => resolve(this.chooseStick(botPlayer, gameHistory)), this.thinkTime(botPlayer));
         });
     }
 
-    // Bot makes a guess about which hand holds the stick
     makeGuess(botPlayer, holderPlayer, gameHistory = [], currentVotes = {}) {
-        const personality = botPlayer.botPersonality;
-        
         return new Promise((resolve) => {
-            // Simulate thinking time
-            const thinkTime = Math.random() * 
-                (personality.reactionTime.max - personality.reactionTime.min) + 
-                personality.reactionTime.min;
-            
-            setTimeout(() => {
-                let guess;
-                
-                if (Math.random() < personality.smartGuessChance) {
-                    // Use strategy based on difficulty
-                    if (botPlayer.botDifficulty === 'hard') {
-                        guess = this.makeStrategicGuess(holderPlayer, gameHistory, currentVotes);
-                    } else if (botPlayer.botDifficulty === 'medium') {
-                        guess = this.makeMediumGuess(holderPlayer, gameHistory, currentVotes);
-                    } else {
-                        guess = Math.random() < 0.5 ? 'left' : 'right';
-                    }
-                } else {
-                    // Random guess
-                    guess = Math.random() < 0.5 ? 'left' : 'right';
-                }
-                
-                resolve(guess);
-            }, thinkTime);
+            setTimeout(() => resolve(this.chooseGuess(botPlayer, holderPlayer, gameHistory, currentVotes)),
+                this.thinkTime(botPlayer));
         });
     }
 
     // Strategic stick placement for hard bots
-    makeStrategicStickChoice(gameHistory) {
-        if (gameHistory.length === 0) {
+    makeStrategicStickChoice() {
+        if (this.stats.rounds === 0) {
             return Math.random() < 0.5 ? 'left' : 'right';
         }
         
         // Analyze recent patterns and avoid them
-        const recentChoices = gameHistory.slice(-3);
-        const leftCount = recentChoices.filter(h => h.stickChoice === 'left').length;
-        const rightCount = recentChoices.length - leftCount;
+        const { left: leftCount, right: rightCount } = this.stats.recentCounts();
         
         // Favor the less common choice
         if (leftCount > rightCount) {
@@ -158,13 +255,13 @@ class BotAI {
     }
 
     // Medium strategy for stick placement
-    makeMediumStickChoice(gameHistory) {
-        if (gameHistory.length === 0) {
+    makeMediumStickChoice() {
+        if (this.stats.rounds === 0) {
             return Math.random() < 0.5 ? 'left' : 'right';
         }
         
         // Simple pattern avoidance
-        const lastChoice = gameHistory[gameHistory.length - 1]?.stickChoice;
+        const lastChoice = this.stats.recent[this.stats.recent.length - 1];
         if (lastChoice && Math.random() < 0.6) {
             return lastChoice === 'left' ? 'right' : 'left';
         }
@@ -173,13 +270,13 @@ class BotAI {
     }
 
     // Strategic guessing for hard bots
-    makeStrategicGuess(holderPlayer, gameHistory, currentVotes) {
+    makeStrategicGuess(holderPlayer, currentVotes) {
         // Analyze holder's patterns
-        const holderHistory = gameHistory.filter(h => h.holderId === holderPlayer.id);
+        const holderStats = this.stats.holder(holderPlayer.id);
         
-        if (holderHistory.length > 0) {
-            const leftCount = holderHistory.filter(h => h.stickChoice === 'left').length;
-            const rightCount = holderHistory.length - leftCount;
+        if (holderStats.total > 0) {
+            const leftCount = holderStats.left;
+            const rightCount = holderStats.total - leftCount;
             
             // Predict based on pattern
             if (leftCount > rightCount * 1.5) {
@@ -204,12 +301,12 @@ class BotAI {
     }
 
     // Medium strategy for guessing
-    makeMediumGuess(holderPlayer, gameHistory, currentVotes) {
+    makeMediumGuess(holderPlayer, currentVotes) {
         // Simple pattern recognition
-        const holderHistory = gameHistory.filter(h => h.holderId === holderPlayer.id);
+        const holderStats = this.stats.holder(holderPlayer.id);
         
-        if (holderHistory.length > 1) {
-            const lastChoice = holderHistory[holderHistory.length - 1]?.stickChoice;
+        if (holderStats.total > 1) {
+            const lastChoice = holderStats.last;
             if (lastChoice && Math.random() < 0.5) {
                 // Sometimes predict they'll switch
                 return lastChoice === 'left' ? 'right' : 'left';
@@ -0,0 +1,377 @@
+# Bot AI logic for Kaataq, ported from bot-ai.js
+#
+# Same personalities and strategies as the browser BotAI, without the
+# simulated thinking time, plus the round scoring rules from
+# KaataqGame.resolveRound. Used by the headless simulator (bot_sim.py) and
+# anything else that needs to play bots outside a browser.
+import random
+
+LEFT = 'left'
+RIGHT = 'right'
+
+# Mirrors BotAI.generatePersonality (reaction times in milliseconds)
+PERSONALITIES = {
+    'easy': {
+        'bluffChance': 0.3,
+        'smartGuessChance': 0.2,
+        'consistency': 0.4,
+        'reactionTime': {'min': 1000, 'max': 3000},
+    },
+    'medium': {
+        'bluffChance': 0.5,
+        'smartGuessChance': 0.6,
+        'consistency': 0.7,
+        'reactionTime': {'min': 800, 'max': 2500},
+    },
+    'hard': {
+        'bluffChance': 0.7,
+        'smartGuessChance': 0.8,
+        'consistency': 0.9,
+        'reactionTime': {'min': 500, 'max': 2000},
+    },
+}
+DIFFICULTIES = tuple(PERSONALITIES)
+
+# Game end rules from KaataqGame.nextRound
+WINNING_SCORE = 5
+MAX_ROUNDS = 10
+
+
+class PatternStats:
+    """Running pattern statistics over a game history (bot-ai.js PatternStats).
+
+    record() is called once per resolved round, so the strategies read
+    counts instead of rescanning the history on every decision.
+    """
+
+    def __init__(self, recent_window=3):
+        self.recent_window = recent_window
+        self.reset()
+
+    def reset(self):
+        self.rounds = 0
+        self.next_index = 0  # next gameHistory index to record
+        self.last_key = None
+        self.recent = []  # last few stick choices by any holder
+        self.holders = {}
+
+    @staticmethod
+    def entry_key(entry):
+        return f"{entry.get('round')}:{entry.get('timestamp')}"
+
+    def sync(self, game_history):
+        """Catch up with a room's gameHistory list, recording only new rounds.
+
+        A shorter history or a different last entry means a reset or another
+        room, so the stats are rebuilt from scratch. None entries are rounds
+        archived out of the room and are skipped.
+        """
+        last = game_history[self.next_index - 1] if 0 < self.next_index <= len(game_history) else None
+        if len(game_history) < self.next_index or (last and self.entry_key(last) != self.last_key):
+            self.reset()
+        for entry in game_history[self.next_index:]:
+            if entry:
+                self.record(entry)
+        self.next_index = len(game_history)
+
+    def record(self, entry):
+        choice = entry.get('stickChoice')
+        self.rounds += 1
+        self.last_key = self.entry_key(entry)
+        self.recent.append(choice)
+        del self.recent[:-self.recent_window]
+
+        stats = self.holders.setdefault(entry.get('holderId'), {
+            'total': 0, 'left': 0, 'right': 0, 'switches': 0,
+            'last': None, 'previous': None,
+            'transitions': {},  # 'left>right' and 'left,right>left' counts
+        })
+        transitions = stats['transitions']
+        if stats['last']:
+            if stats['last'] != choice:
+                stats['switches'] += 1
+            bigram = f"{stats['last']}>{choice}"
+            transitions[bigram] = transitions.get(bigram, 0) + 1
+            if stats['previous']:
+                trigram = f"{stats['previous']},{stats['last']}>{choice}"
+                transitions[trigram] = transitions.get(trigram, 0) + 1
+        stats['total'] += 1
+        if choice in (LEFT, RIGHT):
+            stats[choice] += 1
+        stats['previous'] = stats['last']
+        stats['last'] = choice
+
+    def holder(self, holder_id):
+        return self.holders.get(holder_id, _EMPTY_HOLDER)
+
+    def switch_rate(self, holder_id):
+        stats = self.holder(holder_id)
+        return stats['switches'] / (stats['total'] - 1) if stats['total'] > 1 else 0
+
+    def recent_counts(self):
+        left = self.recent.count(LEFT)
+        return left, len(self.recent) - left
+
+
+_EMPTY_HOLDER = {'total': 0, 'left': 0, 'right': 0, 'switches': 0,
+                 'last': None, 'previous': None, 'transitions': {}}
+
+
+def generate_personality(difficulty):
+    return dict(PERSONALITIES[difficulty])
+
+
+def personality_of(bot):
+    """Rooms in the compact schema store only botDifficulty."""
+    return bot.get('botPersonality') or PERSONALITIES[bot['botDifficulty']]
+
+
+# Compact history entries (game.js compactHistoryEntry): short keys, votes as
+# bitmasks over room['seats']
+HANDS = (LEFT, RIGHT)
+
+
+def compact_history_entry(entry, seats):
+    seat_of = {player_id: seat for seat, player_id in enumerate(seats)}
+    compact = {
+        'r': entry['round'],
+        'h': seat_of.get(entry['holderId'], -1),
+        's': HANDS.index(entry['stickChoice']) if entry.get('stickChoice') in HANDS else -1,
+        'v': 0,
+        'l': 0,
+        't': entry['timestamp'],
+    }
+    for player_id, vote in (entry.get('votes') or {}).items():
+        if player_id in seat_of:
+            compact['v'] |= 1 << seat_of[player_id]
+            if vote == LEFT:
+                compact['l'] |= 1 << seat_of[player_id]
+    return compact
+
+
+def expand_history_entry(entry, seats, players=None):
+    """Full-shape entry from a compact one; full entries pass through."""
+    if not entry or 'r' not in entry:
+        return entry or None
+    votes = {player_id: (LEFT if entry.get('l', 0) & (1 << seat) else RIGHT)
+             for seat, player_id in enumerate(seats) if entry.get('v', 0) & (1 << seat)}
+    stick_choice = HANDS[entry['s']] if entry.get('s', -1) >= 0 else None
+    holder_id = seats[entry['h']] if 0 <= entry.get('h', -1) < len(seats) else None
+    return {
+        'round': entry['r'],
+        'holderId': holder_id,
+        'holderName': ((players or {}).get(holder_id) or {}).get('name'),
+        'stickChoice': stick_choice,
+        'votes': votes,
+        'correctGuessers': [player_id for player_id, vote in votes.items() if vote == stick_choice],
+        'timestamp': entry.get('t'),
+    }
+
+
+def history_list(history):
+    """gameHistory as a list indexed by round - 1, with None for archived
+    rounds; the database returns an index-keyed dict once it is sparse."""
+    if isinstance(history, dict):
+        items = [None] * (max(map(int, history)) + 1) if history else []
+        for key, entry in history.items():
+            items[int(key)] = entry
+        return items
+    return list(history or [])
+
+
+def room_history(room):
+    """A room's history in the full entry shape the strategies read."""
+    seats = seats_of(room)
+    return [expand_history_entry(entry, seats, room.get('players'))
+            for entry in history_list(room.get('gameHistory'))]
+
+
+def seats_of(room):
+    """Player ids in turn order (game.js seatsOf); rooms from before seats
+    existed use join order."""
+    return room.get('seats') or list(room.get('players') or {})
+
+
+def holder_of(room):
+    """The stick holder, room['seats'][currentHolderIndex], or None if that
+    seat's player has left."""
+    seats = seats_of(room)
+    index = room.get('currentHolderIndex') or 0
+    return (room.get('players') or {}).get(seats[index]) if index < len(seats) else None
+
+
+def next_holder_index(room):
+    """Next seat after the holder that still has a player in it."""
+    seats = seats_of(room)
+    players = room.get('players') or {}
+    index = room.get('currentHolderIndex') or 0
+    for step in range(1, len(seats) + 1):
+        if seats[(index + step) % len(seats)] in players:
+            return (index + step) % len(seats)
+    return 0
+
+
+def eligible_voters(players, holder):
+    """Players expected to vote (KaataqGame.eligibleVoters): everyone but
+    the holder, minus players whose connection dropped."""
+    return [player for player in players
+            if player is not holder and player.get('connected') is not False]
+
+
+def eligible_voter_ids(players, holder):
+    """eligibleVoters as written when voting opens: a map of player ids."""
+    return {player['id']: True for player in eligible_voters(players, holder)}
+
+
+def counts_vote(room, player_id):
+    """Whether a vote moves voteCount (countsVote in game.js): only the
+    first one from a player fixed as eligible when voting opened."""
+    return player_id in (room.get('eligibleVoters') or {}) and \
+        player_id not in (room.get('votes') or {})
+
+
+def all_voted(room):
+    """closeWhenAllVoted: the counter is full and the votes confirm it."""
+    eligible = room.get('eligibleVoters') or {}
+    votes = room.get('votes') or {}
+    return bool(eligible) and (room.get('voteCount') or 0) >= len(eligible) and \
+        all(player_id in votes for player_id in eligible)
+
+
+def random_hand(rng=random):
+    return LEFT if rng.random() < 0.5 else RIGHT
+
+
+def opposite(hand):
+    return RIGHT if hand == LEFT else LEFT
+
+
+def think_time(bot, rng=random):
+    """Simulated thinking time in seconds (BotAI.thinkTime, which uses ms)."""
+    reaction = personality_of(bot)['reactionTime']
+    return (rng.random() * (reaction['max'] - reaction['min']) + reaction['min']) / 1000
+
+
+def make_stick_choice(bot, stats, rng=random):
+    """Which hand a bot holder hides the wee in (BotAI.makeStickChoice)."""
+    personality = personality_of(bot)
+    if rng.random() < personality['consistency']:
+        difficulty = bot['botDifficulty']
+        if difficulty == 'hard':
+            return make_strategic_stick_choice(stats, rng)
+        if difficulty == 'medium':
+            return make_medium_stick_choice(stats, rng)
+    return random_hand(rng)
+
+
+def make_guess(bot, holder, stats, current_votes, rng=random):
+    """Which hand a bot voter guesses (BotAI.makeGuess)."""
+    personality = personality_of(bot)
+    if rng.random() < personality['smartGuessChance']:
+        difficulty = bot['botDifficulty']
+        if difficulty == 'hard':
+            return make_strategic_guess(holder, stats, current_votes, rng)
+        if difficulty == 'medium':
+            return make_medium_guess(holder, stats, current_votes, rng)
+    return random_hand(rng)
+
+
+def choose_votes(bots, holder, stats, current_votes, rng=random):
+    """Every bot's vote for a phase in one pass (BotAI.chooseVotes).
+
+    Bots vote in a random order and each sees the votes before it.
+    """
+    votes = dict(current_votes)
+    guesses = {}
+    order = list(bots)
+    rng.shuffle(order)
+    for bot in order:
+        guesses[bot['id']] = votes[bot['id']] = make_guess(bot, holder, stats, votes, rng)
+    return guesses
+
+
+def make_strategic_stick_choice(stats, rng=random):
+    if not stats.rounds:
+        return random_hand(rng)
+
+    # Analyze recent patterns and avoid them
+    left_count, right_count = stats.recent_counts()
+
+    # Favor the less common choice
+    if left_count > right_count:
+        return RIGHT if rng.random() < 0.7 else LEFT
+    if right_count > left_count:
+        return LEFT if rng.random() < 0.7 else RIGHT
+    return random_hand(rng)
+
+
+def make_medium_stick_choice(stats, rng=random):
+    if not stats.rounds:
+        return random_hand(rng)
+
+    # Simple pattern avoidance
+    last_choice = stats.recent[-1]
+    if last_choice and rng.random() < 0.6:
+        return opposite(last_choice)
+    return random_hand(rng)
+
+
+def make_strategic_guess(holder, stats, current_votes, rng=random):
+    # Analyze holder's patterns
+    holder_stats = stats.holder(holder['id'])
+    if holder_stats['total']:
+        left_count = holder_stats['left']
+        right_count = holder_stats['total'] - left_count
+        if left_count > right_count * 1.5:
+            return LEFT if rng.random() < 0.7 else RIGHT
+        if right_count > left_count * 1.5:
+            return RIGHT if rng.random() < 0.7 else LEFT
+
+    # Consider other players' votes (social pressure)
+    votes = list(current_votes.values())
+    left_votes = votes.count(LEFT)
+    right_votes = votes.count(RIGHT)
+    if left_votes > right_votes and rng.random() < 0.4:
+        return LEFT
+    if right_votes > left_votes and rng.random() < 0.4:
+        return RIGHT
+    return random_hand(rng)
+
+
+def make_medium_guess(holder, stats, current_votes, rng=random):
+    # Simple pattern recognition
+    holder_stats = stats.holder(holder['id'])
+    if holder_stats['total'] > 1:
+        last_choice = holder_stats['last']
+        if last_choice and rng.random() < 0.5:
+            # Sometimes predict they'll switch
+            return opposite(last_choice)
+    return random_hand(rng)
+
+
+def score_round(players, votes, holder_id, stick_choice):
+    """Apply the showResults scoring rules.
+
+    players maps id -> player dict with a 'score'; holder_id is None when the
+    holder has left. Returns (updates, correct_guessers) where updates maps
+    player id -> new score.
+    """
+    correct_guessers = [player_id for player_id, vote in votes.items() if vote == stick_choice]
+    total_votes = sum(1 for vote in votes.values() if vote in (LEFT, RIGHT))
+    updates = {}
+
+    # Holder gets points if fewer than half guessed correctly (and is still here)
+    if holder_id in players and len(correct_guessers) < total_votes / 2:
+        updates[holder_id] = (players[holder_id].get('score') or 0) + 1
+
+    # Correct guessers get points
+    for player_id in correct_guessers:
+        if player_id != holder_id and player_id in players:
+            updates[player_id] = (players[player_id].get('score') or 0) + 1
+    return updates, correct_guessers
+
+
+def game_over(players, current_round):
+    """End condition checked by nextRound after each round."""
+    max_score = max((p.get('score') or 0) for p in players.values())
+    return max_score >= WINNING_SCORE or current_round >= MAX_ROUNDS
@@ -0,0 +1,249 @@
+# Headless Kaataq bot simulator
+#
+# Plays whole games between bots with the strategies from bot_ai.py (ported
+# from bot-ai.js) and the scoring and end rules of game.js, vectorized with
+# NumPy across many independent games at once. No thinking-time delays, so
+# difficulty tuning takes seconds instead of live play.
+#
+#     python bot_sim.py --games 200000 --players 4
+#     python bot_sim.py --lineup hard,easy,easy,medium --set hard.smartGuessChance=0.7
+import argparse
+import itertools
+import time
+
+import numpy as np
+
+from bot_ai import DIFFICULTIES, MAX_ROUNDS, PERSONALITIES, WINNING_SCORE
+
+LEFT, RIGHT, NONE = 0, 1, -1
+RECENT_WINDOW = 3  # makeStrategicStickChoice looks at the last 3 rounds
+
+
+def _random_hands(rng, size):
+    return (rng.random(size) >= 0.5).astype(np.int8)
+
+
+def _lean(rng, size, toward, strength=0.7):
+    """Pick `toward` with probability strength, otherwise the other hand."""
+    return np.where(rng.random(size) < strength, toward, 1 - toward).astype(np.int8)
+
+
+def _stick_choices(rng, difficulty, personality, recent, rounds_played):
+    """Vectorized makeStickChoice for one holder across every game."""
+    games = recent.shape[0]
+    choice = _random_hands(rng, games)
+    if difficulty == 'easy' or rounds_played == 0:
+        return choice
+
+    if difficulty == 'hard':
+        # Favor whichever hand was used less in the last few rounds
+        window = recent[:, -min(rounds_played, RECENT_WINDOW):]
+        left_count = (window == LEFT).sum(axis=1)
+        right_count = window.shape[1] - left_count
+        strategic = np.where(left_count > right_count, _lean(rng, games, RIGHT),
+                             np.where(right_count > left_count, _lean(rng, games, LEFT), choice))
+    else:
+        # Medium: switch from the previous round's hand 60% of the time
+        last = recent[:, -1]
+        strategic = np.where(rng.random(games) < 0.6, 1 - last, choice)
+
+    consistent = rng.random(games) < personality['consistency']
+    return np.where(consistent, strategic, choice).astype(np.int8)
+
+
+def _guesses(rng, difficulty, personality, holder_left, holder_total, holder_last,
+             left_votes, right_votes):
+    """Vectorized makeGuess for one voter across every game."""
+    games = holder_left.shape[0]
+    guess = _random_hands(rng, games)
+    if difficulty == 'easy':
+        return guess
+
+    if difficulty == 'hard':
+        # Social pressure first, then let a clear holder pattern override it
+        crowd = rng.random(games) < 0.4
+        strategic = np.where((left_votes > right_votes) & crowd, LEFT,
+                             np.where((right_votes > left_votes) & crowd, RIGHT, guess))
+        if holder_total > 0:
+            right_count = holder_total - holder_left
+            strategic = np.where(holder_left > right_count * 1.5, _lean(rng, games, LEFT),
+                                 np.where(right_count > holder_left * 1.5,
+                                          _lean(rng, games, RIGHT), strategic))
+    else:
+        # Medium: predict a switch from the holder's last hand half the time
+        strategic = guess
+        if holder_total > 1:
+            strategic = np.where(rng.random(games) < 0.5, 1 - holder_last, guess)
+
+    smart = rng.random(games) < personality['smartGuessChance']
+    return np.where(smart, strategic, guess).astype(np.int8)
+
+
+def simulate(lineup, games, rng=None, personalities=PERSONALITIES):
+    """Play `games` independent games with one bot per seat in lineup.
+
+    Seats keep their order, so the first seat is the first stick holder,
+    exactly like currentHolderIndex in a room. Returns a dict with final
+    'scores' (games x seats), the 'winners' seat index per game (ties go to
+    the earlier seat, as the end screen's stable sort does), 'ties' and the
+    number of 'rounds' played in total.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    seats = len(lineup)
+    if seats < 2:
+        raise ValueError('A game needs at least 2 players')
+
+    scores = np.zeros((games, seats), dtype=np.int16)
+    active = np.ones(games, dtype=bool)
+    recent = np.full((games, RECENT_WINDOW), NONE, dtype=np.int8)
+    holder_left = np.zeros((games, seats), dtype=np.int16)
+    holder_last = np.full((games, seats), NONE, dtype=np.int8)
+    holder_total = np.zeros(seats, dtype=np.int16)  # identical in every game
+    seat_kind = np.array(lineup)
+    all_games = np.arange(games)
+    rounds = 0
+
+    for round_index in range(MAX_ROUNDS):
+        if not active.any():
+            break
+        holder = round_index % seats
+        choice = _stick_choices(rng, lineup[holder], personalities[lineup[holder]],
+                                recent, round_index)
+
+        # Voters act in a random order per game, and hard bots follow the
+        # votes cast before theirs. Guesses depend on the voter's difficulty
+        # rather than the seat, so each position is computed once per
+        # difficulty and picked per game.
+        voters = np.array([seat for seat in range(seats) if seat != holder])
+        order = voters[np.argsort(rng.random((games, len(voters))), axis=1)]
+        kinds = sorted({lineup[seat] for seat in voters})
+        left_votes = np.zeros(games, dtype=np.int16)
+        right_votes = np.zeros(games, dtype=np.int16)
+        correct = np.zeros((games, seats), dtype=bool)
+        for position in range(len(voters)):
+            seat = order[:, position]
+            guess = np.empty(games, dtype=np.int8)
+            for kind in kinds:
+                mask = seat_kind[seat] == kind
+                guess[mask] = _guesses(rng, kind, personalities[kind],
+                                       holder_left[:, holder], holder_total[holder],
+                                       holder_last[:, holder], left_votes, right_votes)[mask]
+            left_votes += guess == LEFT
+            right_votes += guess == RIGHT
+            correct[all_games, seat] = guess == choice
+
+        # Scoring from resolveRound
+        correct_count = correct.sum(axis=1)
+        gained = correct.astype(np.int16)
+        gained[:, holder] = correct_count < len(voters) / 2
+        scores += gained * active[:, None]
+        rounds += int(active.sum())
+
+        # History used by the strategies
+        recent = np.concatenate([recent[:, 1:], choice[:, None]], axis=1)
+        holder_left[:, holder] += choice == LEFT
+        holder_last[:, holder] = choice
+        holder_total[holder] += 1
+
+        # End rules from nextRound
+        finished = (scores.max(axis=1) >= WINNING_SCORE) | (round_index + 1 >= MAX_ROUNDS)
+        active &= ~finished
+
+    best = scores.max(axis=1)
+    return {
+        'scores': scores,
+        'winners': scores.argmax(axis=1),
+        'ties': (scores == best[:, None]).sum(axis=1) > 1,
+        'rounds': rounds,
+    }
+
+
+def tournament(players, games, rng=None, personalities=PERSONALITIES, difficulties=DIFFICULTIES):
+    """Round-robin between difficulties.
+
+    Each pairing plays at a table of `players` seats alternating the two
+    difficulties, once with each difficulty seated first. Returns a list of
+    (difficulty_a, difficulty_b, win_rate_a, win_rate_b, tie_rate) and the
+    total rounds simulated.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    results = []
+    rounds = 0
+    for a, b in itertools.combinations(difficulties, 2):
+        wins = {a: 0, b: 0}
+        ties = 0
+        for first, second in ((a, b), (b, a)):
+            lineup = [first if seat % 2 == 0 else second for seat in range(players)]
+            outcome = simulate(lineup, games, rng, personalities)
+            rounds += outcome['rounds']
+            ties += int(outcome['ties'].sum())
+            decided = ~outcome['ties']
+            winners = np.array(lineup)[outcome['winners'][decided]]
+            wins[a] += int((winners == a).sum())
+            wins[b] += int((winners == b).sum())
+        total = 2 * games
+        results.append((a, b, wins[a] / total, wins[b] / total, ties / total))
+    return results, rounds
+
+
+def apply_overrides(overrides):
+    """Turn ['hard.smartGuessChance=0.7', ...] into a personalities dict."""
+    personalities = {name: dict(traits) for name, traits in PERSONALITIES.items()}
+    for override in overrides:
+        key, _, value = override.partition('=')
+        difficulty, _, trait = key.partition('.')
+        if difficulty not in personalities or trait not in personalities[difficulty]:
+            raise SystemExit(f'Unknown personality trait: {key}')
+        personalities[difficulty][trait] = float(value)
+    return personalities
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Simulate Kaataq bot games.')
+    parser.add_argument('--games', type=int, default=100000,
+                        help='games per seating (default: 100000)')
+    parser.add_argument('--players', type=int, default=4,
+                        help='seats per table in the round-robin (default: 4)')
+    parser.add_argument('--lineup',
+                        help='comma-separated difficulties for a single table instead of a round-robin')
+    parser.add_argument('--set', action='append', default=[], metavar='DIFFICULTY.TRAIT=VALUE',
+                        help='override a personality trait, e.g. hard.consistency=0.8')
+    parser.add_argument('--seed', type=int, help='random seed for reproducible runs')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = np.random.default_rng(args.seed)
+    personalities = apply_overrides(args.set)
+    started = time.perf_counter()
+
+    if args.lineup:
+        lineup = [name.strip() for name in args.lineup.split(',')]
+        unknown = [name for name in lineup if name not in personalities]
+        if unknown:
+            raise SystemExit(f"Unknown difficulty: {', '.join(unknown)}")
+        outcome = simulate(lineup, args.games, rng, personalities)
+        rounds = outcome['rounds']
+        decided = ~outcome['ties']
+        print(f"🎲 {args.games:,} games, lineup {', '.join(lineup)}")
+        print(f"  {'seat':<6}{'difficulty':<12}{'win rate':>10}{'avg score':>11}")
+        for seat, difficulty in enumerate(lineup):
+            wins = int((outcome['winners'][decided] == seat).sum())
+            print(f"  {seat:<6}{difficulty:<12}{wins / args.games:>10.1%}"
+                  f"{outcome['scores'][:, seat].mean():>11.2f}")
+        print(f"  ties: {outcome['ties'].mean():.1%}")
+    else:
+        results, rounds = tournament(args.players, args.games, rng, personalities)
+        print(f"🎲 Round-robin, {args.players} seats, {2 * args.games:,} games per pairing")
+        print(f"  {'pairing':<18}{'win A':>8}{'win B':>8}{'ties':>8}")
+        for a, b, win_a, win_b, tie_rate in results:
+            print(f"  {a + ' vs ' + b:<18}{win_a:>8.1%}{win_b:>8.1%}{tie_rate:>8.1%}")
+
+    elapsed = time.perf_counter() - started
+    print(f"\n⏱️  {rounds:,} rounds in {elapsed:.2f}s "
+          f"({rounds / elapsed * 60 / 1e6:.1f}M rounds/minute)")
+
+
+if __name__ == '__main__':
+    main()
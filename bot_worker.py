@@ -0,0 +1,256 @@
+# Kaataq bot worker
+#
+# Drives the bots of many rooms from one asyncio process, so a room full of
+# bots keeps playing when the host's phone sleeps or throttles its timers.
+# It follows every room over a single event stream, claims rooms that have
+# bots by writing a `botsManaged` heartbeat into them (the host tab leaves
+# claimed rooms alone), and plays with the BotAI strategies from bot_ai.py.
+#
+#     python room_server.py --port 8765 --static dist
+#     python bot_worker.py --url http://127.0.0.1:8765/db
+import argparse
+import asyncio
+import random
+import uuid
+
+import bot_ai
+from room_client import TIMESTAMP, RoomClient, RoomClientError, increment
+from room_server import Database, now_ms
+
+HEARTBEAT_SECONDS = 15
+CLAIM_TIMEOUT_MS = 45000  # game.js config.botClaimTimeout
+STICK_CHOICE_DELAY = 0.5  # same pacing as KaataqGame.handleBotActions
+VOTE_DELAY = (1.0, 4.0)
+
+
+class RoomBots:
+    """Per-room state: the phase the bots last acted in and the history stats."""
+
+    def __init__(self, code):
+        self.code = code
+        self.phase_key = None
+        self.task = None
+        self.stats = bot_ai.PatternStats()
+
+    def cancel(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+
+class BotWorker:
+    def __init__(self, client, worker_id=None, rooms=None, voting_time=30, rng=None):
+        self.client = client
+        self.worker_id = worker_id or 'worker_' + uuid.uuid4().hex[:8]
+        self.only_rooms = set(rooms) if rooms else None
+        self.voting_time = voting_time
+        self.rng = rng or random.Random()
+        self.mirror = Database()  # local copy of /rooms, fed by the event stream
+        self.rooms = {}  # code -> RoomBots for rooms this worker has claimed
+        self.claiming = set()
+        self.actions = 0
+        self.writes = 0
+
+    async def run(self):
+        heartbeat = asyncio.ensure_future(self.heartbeat())
+        try:
+            async for event, parts, data in self.client.listen('rooms'):
+                if event == 'put':
+                    self.mirror.set(['rooms'] + parts, data)
+                    codes = [parts[0]] if parts else list(self.mirror.root.get('rooms', {}))
+                else:
+                    self.mirror.update(['rooms'] + parts, data)
+                    codes = [parts[0]] if parts else {key.split('/')[0] for key in data}
+                for code in codes:
+                    self.room_changed(code)
+        finally:
+            heartbeat.cancel()
+            for room in self.rooms.values():
+                room.cancel()
+            await self.release()
+
+    # Claims
+
+    def claimable(self, room):
+        if self.only_rooms is not None and room['code'] not in self.only_rooms:
+            return False
+        players = room.get('players') or {}
+        return any(player.get('isBot') for player in players.values())
+
+    def claim_is_live(self, claim):
+        # Claims carry the server clock; the worker runs next to the server,
+        # so its own clock is close enough for the timeout
+        return bool(claim) and now_ms() - (claim.get('seenAt') or 0) < CLAIM_TIMEOUT_MS
+
+    async def claim(self, code):
+        def take(claim):
+            if claim and claim.get('worker') != self.worker_id and self.claim_is_live(claim):
+                return None  # another live worker has it
+            return {'worker': self.worker_id, 'seenAt': TIMESTAMP}
+
+        try:
+            committed, claim = await self.client.transaction(f'rooms/{code}/botsManaged', take)
+            self.writes += 1
+        except (OSError, RoomClientError) as error:
+            print(f"❌ Room {code}: could not claim ({error})")
+            committed = False
+        finally:
+            self.claiming.discard(code)
+        if committed:
+            # The stream will echo the claim; don't wait for it
+            self.mirror.set(['rooms', code, 'botsManaged'], claim)
+            self.rooms[code] = RoomBots(code)
+            print(f"🤖 Driving bots in room {code}")
+            self.room_changed(code)
+
+    async def heartbeat(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            live = [code for code in self.rooms if self.mirror.get(['rooms', code, 'host'])]
+            for code in set(self.rooms) - set(live):
+                self.rooms.pop(code).cancel()
+            await asyncio.gather(*(self.refresh_claim(code) for code in live))
+
+    async def refresh_claim(self, code):
+        # A plain write to seenAt would recreate a room deleted since the
+        # mirror last heard of it, so the claim is refreshed conditionally:
+        # a PUT matched against the claim the mirror holds, aborted if the
+        # claim (and with it the room) is gone or another worker took over
+        def refresh(claim):
+            if not claim or claim.get('worker') != self.worker_id:
+                return None
+            return {'worker': self.worker_id, 'seenAt': TIMESTAMP}
+
+        try:
+            await self.client.transaction(f'rooms/{code}/botsManaged', refresh,
+                                          cached=self.mirror.get(['rooms', code, 'botsManaged']))
+            self.writes += 1
+        except (OSError, RoomClientError) as error:
+            print(f"❌ Room {code}: heartbeat failed ({error})")
+
+    async def release(self):
+        live = [code for code in self.rooms if self.mirror.get(['rooms', code, 'host'])]
+        if live:
+            await self.client.update('rooms', {f'{code}/botsManaged': None for code in live})
+
+    # Playing
+
+    def room_changed(self, code):
+        room = self.mirror.get(['rooms', code])
+        if not room or not room.get('host'):
+            # Room deleted
+            if code in self.rooms:
+                self.rooms.pop(code).cancel()
+            return
+        room['code'] = code
+
+        if code not in self.rooms:
+            if code not in self.claiming and self.claimable(room) and \
+                    not self.claim_is_live(room.get('botsManaged')):
+                self.claiming.add(code)
+                asyncio.ensure_future(self.claim(code))
+            return
+
+        claim = room.get('botsManaged')
+        if claim and claim.get('worker') != self.worker_id:
+            # Taken over by another worker after our heartbeat lapsed
+            self.rooms.pop(code).cancel()
+            return
+        self.plan(self.rooms[code], room)
+
+    def plan(self, bots, room):
+        """Mirror of handleBotActions: at most one batch per phase."""
+        if not room.get('gameStarted') or room.get('gameEnded'):
+            return
+        phase_key = f"{room.get('currentRound')}:{room.get('roundPhase')}:{room.get('phaseStartedAt')}"
+        if bots.phase_key == phase_key:
+            return
+        bots.cancel()  # a pending batch belongs to a phase that has ended
+        bots.phase_key = phase_key
+
+        players = list((room.get('players') or {}).values())
+        holder = bot_ai.holder_of(room)
+        history = bot_ai.room_history(room)
+
+        if room.get('roundPhase') == 'stick_choice' and holder and holder.get('isBot') \
+                and not room.get('stickChoice'):
+            delay = STICK_CHOICE_DELAY + bot_ai.think_time(holder, self.rng)
+
+            def act():
+                bots.stats.sync(history)
+                return {
+                    'stickChoice': bot_ai.make_stick_choice(holder, bots.stats, self.rng),
+                    'roundPhase': 'voting',
+                    'phaseStartedAt': TIMESTAMP,
+                    'phaseDuration': self.voting_time,
+                    'voteCount': 0,
+                    'eligibleVoters': bot_ai.eligible_voter_ids(players, holder),
+                }
+        elif room.get('roundPhase') == 'voting':
+            votes = room.get('votes') or {}
+            voters = [player for player in players if player.get('isBot')
+                      and not votes.get(player['id']) and player is not holder]
+            if not voters:
+                return
+            delay = self.rng.uniform(*VOTE_DELAY)
+
+            def act():
+                bots.stats.sync(history)
+                guesses = bot_ai.choose_votes(voters, holder, bots.stats, votes, self.rng)
+                updates = {f'votes/{bot_id}': guess for bot_id, guess in guesses.items()}
+                latest = self.mirror.get(['rooms', bots.code]) or room
+                counted = sum(bot_ai.counts_vote(latest, bot_id) for bot_id in guesses)
+                if counted:
+                    updates['voteCount'] = increment(counted)
+                return updates
+        else:
+            return
+
+        bots.task = asyncio.ensure_future(self.act_later(bots, phase_key, delay, act))
+
+    async def act_later(self, bots, phase_key, delay, act):
+        await asyncio.sleep(delay)
+        if bots.phase_key != phase_key:
+            return
+        bots.task = None
+        try:
+            await self.client.update(f'rooms/{bots.code}', act())
+            self.actions += 1
+            self.writes += 1
+        except (OSError, RoomClientError) as error:
+            print(f"❌ Room {bots.code}: {error}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Drive Kaataq bots for many rooms.')
+    parser.add_argument('--url', default='http://127.0.0.1:8765/db',
+                        help='database URL of the room server (default: %(default)s)')
+    parser.add_argument('--rooms', help='comma-separated room codes to drive (default: every room with bots)')
+    parser.add_argument('--voting-time', type=int, default=30,
+                        help='seconds of voting after a bot hides the wee (game.js config.votingTime)')
+    parser.add_argument('--seed', type=int, help='random seed for reproducible bots')
+    return parser.parse_args(argv)
+
+
+async def run_worker(args):
+    client = RoomClient(args.url)
+    rooms = [code.strip() for code in args.rooms.split(',')] if args.rooms else None
+    worker = BotWorker(client, rooms=rooms, voting_time=args.voting_time,
+                       rng=random.Random(args.seed))
+    print(f"🤖 Bot worker {worker.worker_id} watching {args.url}")
+    try:
+        await worker.run()
+    finally:
+        await client.close()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        asyncio.run(run_worker(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,462 @@
+// Local Firebase stand-in for Kaataq
+// Implements the part of the compat firebase.database() API that KaataqGame
+// uses (value and child_* events, transactions and onDisconnect included),
+// backed by room_server.py instead of the hosted Realtime Database.
+// Load it in place of the Firebase CDN scripts; firebaseConfig.databaseURL
+// should point at the server's /db endpoint (a relative URL is fine).
+(function () {
+    const TIMESTAMP = { '.sv': 'timestamp' };
+
+    function splitPath(path) {
+        return String(path || '').split('/').filter(Boolean);
+    }
+
+    function clone(value) {
+        return value === undefined ? null : JSON.parse(JSON.stringify(value));
+    }
+
+    function isEmpty(value) {
+        return value === null || value === undefined ||
+            (typeof value === 'object' && Object.keys(value).length === 0);
+    }
+
+    // Stored form matches room_server.py: arrays become index-keyed objects
+    // and empty containers disappear.
+    function normalize(value) {
+        if (value === null || value === undefined) return null;
+        if (typeof value !== 'object') return value;
+        const stored = {};
+        Object.keys(value).forEach(key => {
+            const child = normalize(value[key]);
+            if (child !== null) stored[key] = child;
+        });
+        return Object.keys(stored).length ? stored : null;
+    }
+
+    // Dense integer-keyed objects come back out as arrays, like the real SDK
+    function exportValue(value) {
+        if (value === null || typeof value !== 'object') return value;
+        const keys = Object.keys(value);
+        if (keys.length && keys.every(key => /^\d+$/.test(key))) {
+            const max = Math.max(...keys.map(Number));
+            if (max < 2 * keys.length) {
+                const items = new Array(max + 1).fill(null);
+                keys.forEach(key => { items[Number(key)] = exportValue(value[key]); });
+                return items;
+            }
+        }
+        const out = {};
+        keys.forEach(key => { out[key] = exportValue(value[key]); });
+        return out;
+    }
+
+    function getIn(tree, parts) {
+        let node = tree;
+        for (const part of parts) {
+            if (node === null || typeof node !== 'object' || !(part in node)) return null;
+            node = node[part];
+        }
+        return node;
+    }
+
+    // Returns the new tree; containers along the path are copied so earlier
+    // snapshots never change underneath their holders.
+    function setIn(tree, parts, value) {
+        if (parts.length === 0) return normalize(value);
+        const base = (tree !== null && typeof tree === 'object') ? Object.assign({}, tree) : {};
+        const [head, ...rest] = parts;
+        const child = setIn(base[head] === undefined ? null : base[head], rest, value);
+        if (child === null) {
+            delete base[head];
+        } else {
+            base[head] = child;
+        }
+        return isEmpty(base) ? null : base;
+    }
+
+    class DataSnapshot {
+        constructor(key, value) {
+            this.key = key;
+            this._value = value === undefined ? null : value;
+        }
+
+        val() {
+            return clone(exportValue(this._value));
+        }
+
+        exists() {
+            return !isEmpty(this._value);
+        }
+
+        child(path) {
+            const parts = splitPath(path);
+            return new DataSnapshot(parts[parts.length - 1] || this.key, getIn(this._value, parts));
+        }
+
+        forEach(callback) {
+            if (this._value === null || typeof this._value !== 'object') return false;
+            return Object.keys(this._value).some(key => callback(this.child(key)) === true);
+        }
+    }
+
+    // room_server.py's ETag for a stored value: SHA-1 of its JSON with sorted
+    // keys and non-ASCII escaped, as Python writes it. Resolves to null where
+    // WebCrypto is unavailable; any other mismatch only costs a 412 retry.
+    function canonicalJSON(value) {
+        if (Array.isArray(value)) return '[' + value.map(canonicalJSON).join(',') + ']';
+        if (value !== null && typeof value === 'object') {
+            return '{' + Object.keys(value).sort().map(key =>
+                canonicalJSON(key) + ':' + canonicalJSON(value[key])).join(',') + '}';
+        }
+        return JSON.stringify(value).replace(/[\u007f-\uffff]/g,
+            char => '\\u' + char.charCodeAt(0).toString(16).padStart(4, '0'));
+    }
+
+    function etagOf(value) {
+        if (value === null) return Promise.resolve('null_etag');
+        if (!window.crypto || !window.crypto.subtle) return Promise.resolve(null);
+        const bytes = new TextEncoder().encode(canonicalJSON(value));
+        return window.crypto.subtle.digest('SHA-1', bytes).then(hash => Array.from(new Uint8Array(hash))
+            .map(byte => byte.toString(16).padStart(2, '0')).join(''));
+    }
+
+    const MAX_TRANSACTION_ATTEMPTS = 25;
+    const CHILD_EVENTS = ['child_added', 'child_changed', 'child_removed'];
+    const EVENT_TYPES = ['value'].concat(CHILD_EVENTS);
+
+    function childrenOf(value) {
+        return (value !== null && typeof value === 'object') ? value : {};
+    }
+
+    // One event stream per listened path, shared by every callback on it
+    class PathListener {
+        constructor(db, parts) {
+            this.db = db;
+            this.parts = parts;
+            this.value = null;
+            this.ready = false;
+            this.callbacks = {};
+            EVENT_TYPES.forEach(type => { this.callbacks[type] = new Set(); });
+            // The session ties the stream to this page's onDisconnect() writes
+            this.source = new EventSource(db.url(parts) + '?session=' + db.session);
+            this.source.addEventListener('put', (event) => this.apply(event, false));
+            this.source.addEventListener('patch', (event) => this.apply(event, true));
+            this.source.onerror = () => {
+                // EventSource reconnects on its own and the server starts
+                // every stream with a full 'put', so the cache resyncs itself.
+            };
+        }
+
+        apply(event, isPatch) {
+            const message = JSON.parse(event.data);
+            const base = splitPath(message.path);
+            const previous = this.value;
+            // Only the direct children named by the written paths can have
+            // changed; null means a write at the root that may touch any child.
+            let touched = base.length ? [base[0]] : null;
+            if (isPatch) {
+                const keys = Object.keys(message.data || {});
+                keys.forEach(key => {
+                    this.value = setIn(this.value, base.concat(splitPath(key)), message.data[key]);
+                });
+                if (!base.length) touched = Array.from(new Set(keys.map(key => splitPath(key)[0])));
+            } else {
+                this.value = setIn(this.value, base, message.data);
+            }
+            const initial = !this.ready;
+            this.ready = true;
+            this.emit(previous, touched, initial);
+        }
+
+        emit(previous, touched, initial) {
+            // setIn copies only the containers along the written path, so an
+            // unchanged child keeps its identity and the diff is a shallow one.
+            const before = childrenOf(previous);
+            const after = childrenOf(this.value);
+            const keys = touched ||
+                Object.keys(before).concat(Object.keys(after).filter(key => !(key in before)));
+            keys.forEach(key => {
+                if (key in before && !(key in after)) {
+                    this.fire('child_removed', key, before[key]);
+                } else if (!(key in before) && key in after) {
+                    this.fire('child_added', key, after[key]);
+                } else if (before[key] !== after[key]) {
+                    this.fire('child_changed', key, after[key]);
+                }
+            });
+            if (initial || previous !== this.value) {
+                const snapshot = this.snapshot();
+                this.callbacks.value.forEach(callback => callback(snapshot));
+            }
+        }
+
+        fire(type, key, value) {
+            if (this.callbacks[type].size === 0) return;
+            const snapshot = new DataSnapshot(key, value);
+            this.callbacks[type].forEach(callback => callback(snapshot));
+        }
+
+        snapshot() {
+            return new DataSnapshot(this.parts[this.parts.length - 1] || null, this.value);
+        }
+
+        add(eventType, callback) {
+            this.callbacks[eventType].add(callback);
+            if (!this.ready) return;
+            if (eventType === 'value') {
+                callback(this.snapshot());
+            } else if (eventType === 'child_added') {
+                const children = childrenOf(this.value);
+                Object.keys(children).forEach(key => callback(new DataSnapshot(key, children[key])));
+            }
+        }
+
+        remove(eventType, callback) {
+            const types = eventType ? [eventType] : EVENT_TYPES;
+            types.forEach(type => {
+                if (callback) {
+                    this.callbacks[type].delete(callback);
+                } else {
+                    this.callbacks[type].clear();
+                }
+            });
+            if (EVENT_TYPES.every(type => this.callbacks[type].size === 0)) this.close();
+        }
+
+        close() {
+            this.source.close();
+            this.db.listeners.delete(this.parts.join('/'));
+        }
+    }
+
+    // Writes the server runs once this page's event streams are gone,
+    // queued with POST <path>.json?session=<id>&onDisconnect=<operation>
+    class OnDisconnect {
+        constructor(db, parts) {
+            this.db = db;
+            this.parts = parts;
+        }
+
+        queue(operation, body) {
+            return this.db.request('POST', this.parts, body,
+                { session: this.db.session, onDisconnect: operation }).then(() => undefined);
+        }
+
+        set(value) {
+            return this.queue('set', value);
+        }
+
+        update(values) {
+            return this.queue('update', values);
+        }
+
+        remove() {
+            return this.queue('remove');
+        }
+
+        cancel() {
+            return this.queue('cancel');
+        }
+    }
+
+    class Reference {
+        constructor(db, parts) {
+            this.db = db;
+            this.parts = parts;
+            this.key = parts.length ? parts[parts.length - 1] : null;
+        }
+
+        child(path) {
+            return new Reference(this.db, this.parts.concat(splitPath(path)));
+        }
+
+        set(value) {
+            return this.db.request('PUT', this.parts, value).then(() => undefined);
+        }
+
+        update(values) {
+            return this.db.request('PATCH', this.parts, values).then(() => undefined);
+        }
+
+        remove() {
+            return this.db.request('DELETE', this.parts).then(() => undefined);
+        }
+
+        onDisconnect() {
+            return new OnDisconnect(this.db, this.parts);
+        }
+
+        // Optimistic concurrency against the server's ETags: read, apply the
+        // update function, write with if-match, and rerun on a conflict.
+        // Returning undefined from the update function aborts. Like the SDK,
+        // the first attempt starts from a live listener's copy when there is
+        // one, skipping the read; an abort decided on that copy is checked
+        // against the server before it counts.
+        transaction(transactionUpdate, onComplete) {
+            const read = () => this.db.conditionalRequest('GET', this.parts);
+            const attempt = (current, tries, fromCache) => {
+                const next = transactionUpdate(clone(current.data));
+                if (next === undefined) {
+                    if (fromCache) return read().then(fresh => attempt(fresh, tries, false));
+                    return { committed: false, value: current.data };
+                }
+                return this.db.conditionalRequest('PUT', this.parts, next, current.etag).then(result => {
+                    if (result.status !== 412) return { committed: true, value: result.data };
+                    if (tries >= MAX_TRANSACTION_ATTEMPTS) throw new Error('maxretry');
+                    return attempt(result, tries + 1, false); // 412 carries the current value and ETag
+                });
+            };
+
+            // The listener holds the stored form; the update function and the
+            // server's ETag both see the exported one (arrays as arrays)
+            const cached = this.db.cached(this.parts);
+            const exported = cached === undefined ? undefined : exportValue(cached);
+            const first = cached === undefined ? read().then(current => attempt(current, 1, false)) :
+                etagOf(exported).then(etag => etag ? attempt({ data: exported, etag: etag }, 1, true) :
+                    read().then(current => attempt(current, 1, false)));
+            return first.then(({ committed, value }) => {
+                const snapshot = new DataSnapshot(this.key, normalize(value));
+                if (onComplete) onComplete(null, committed, snapshot);
+                return { committed: committed, snapshot: snapshot };
+            }, (error) => {
+                if (onComplete) onComplete(error, false, null);
+                throw error;
+            });
+        }
+
+        on(eventType, callback) {
+            if (this.parts[0] === '.info') {
+                this.db.info(this.parts).then(value => callback(new DataSnapshot(this.key, value)));
+                return callback;
+            }
+            if (!EVENT_TYPES.includes(eventType)) {
+                throw new Error(`Unsupported event type: ${eventType}`);
+            }
+            this.db.listen(this.parts).add(eventType, callback);
+            return callback;
+        }
+
+        off(eventType, callback) {
+            if (this.parts[0] === '.info') return;
+            const listener = this.db.listeners.get(this.parts.join('/'));
+            if (listener) listener.remove(eventType, callback);
+        }
+
+        once(eventType) {
+            if (eventType !== 'value') {
+                return Promise.reject(new Error(`Unsupported event type: ${eventType}`));
+            }
+            if (this.parts[0] === '.info') {
+                return this.db.info(this.parts).then(value => new DataSnapshot(this.key, value));
+            }
+            // A live listener on this path or above already has the current value
+            const cached = this.db.cached(this.parts);
+            if (cached !== undefined) {
+                return Promise.resolve(new DataSnapshot(this.key, cached));
+            }
+            return this.db.request('GET', this.parts)
+                .then(value => new DataSnapshot(this.key, normalize(value)));
+        }
+    }
+
+    class Database {
+        constructor(config) {
+            const base = (config && config.databaseURL) || '/db';
+            this.baseURL = new URL(base, window.location.href).href.replace(/\/+$/, '');
+            this.listeners = new Map();
+            this.serverTimeOffset = null;
+            this.session = Math.random().toString(36).substr(2, 12);
+        }
+
+        // Only .info/serverTimeOffset is supported: estimated once from a
+        // round trip to the server clock
+        info(parts) {
+            if (parts[1] !== 'serverTimeOffset') return Promise.resolve(null);
+            if (!this.serverTimeOffset) {
+                const sentAt = Date.now();
+                this.serverTimeOffset = this.request('GET', ['.info', 'serverTime'])
+                    .then(serverTime => serverTime - Math.round((sentAt + Date.now()) / 2))
+                    .catch(() => 0);
+            }
+            return this.serverTimeOffset;
+        }
+
+        url(parts, query) {
+            const url = `${this.baseURL}/${parts.map(encodeURIComponent).join('/')}.json`;
+            return query ? url + '?' + new URLSearchParams(query) : url;
+        }
+
+        ref(path) {
+            return new Reference(this, splitPath(path));
+        }
+
+        listen(parts) {
+            const key = parts.join('/');
+            if (!this.listeners.has(key)) {
+                this.listeners.set(key, new PathListener(this, parts));
+            }
+            return this.listeners.get(key);
+        }
+
+        // The value a ready listener on parts or one of its parents holds,
+        // or undefined when nothing is listening there
+        cached(parts) {
+            for (let length = parts.length; length >= 0; length--) {
+                const listener = this.listeners.get(parts.slice(0, length).join('/'));
+                if (listener && listener.ready) return getIn(listener.value, parts.slice(length));
+            }
+            return undefined;
+        }
+
+        request(method, parts, body, query) {
+            const options = { method: method, headers: {} };
+            if (body !== undefined) {
+                options.headers['Content-Type'] = 'application/json';
+                options.body = JSON.stringify(body);
+            }
+            return fetch(this.url(parts, query), options).then(response => response.json().then(data => {
+                if (!response.ok) {
+                    throw new Error((data && data.error) || `Request failed (${response.status})`);
+                }
+                return data;
+            }));
+        }
+
+        // Like request(), but with ETags: resolves to { status, data, etag }
+        // and treats 412 (if-match failed) as an answer rather than an error
+        conditionalRequest(method, parts, body, etag) {
+            const options = { method: method, headers: { 'X-Firebase-ETag': 'true' } };
+            if (etag) options.headers['if-match'] = etag;
+            if (body !== undefined) {
+                options.headers['Content-Type'] = 'application/json';
+                options.body = JSON.stringify(body);
+            }
+            return fetch(this.url(parts), options).then(response => response.json().then(data => {
+                if (!response.ok && response.status !== 412) {
+                    throw new Error((data && data.error) || `Request failed (${response.status})`);
+                }
+                return { status: response.status, data: data, etag: response.headers.get('ETag') };
+            }));
+        }
+    }
+
+    let app = null;
+    let database = null;
+
+    function databaseFactory() {
+        if (!database) database = new Database(app ? app.options : null);
+        return database;
+    }
+    databaseFactory.ServerValue = {
+        TIMESTAMP: TIMESTAMP,
+        increment: (delta) => ({ '.sv': { increment: delta } })
+    };
+
+    window.firebase = {
+        initializeApp(config) {
+            app = { options: config || {} };
+            return app;
+        },
+        database: databaseFactory
+    };
+})();
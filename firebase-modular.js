@@ -0,0 +1,108 @@
+// Modular Firebase SDK adapter for Kaataq
+// Implements the same window.firebase surface as firebase-local.js - the
+// part of the compat firebase.database() API that KaataqGame uses - on top
+// of the v9 modular functions. The page loads the modular CDN builds of
+// firebase-app and firebase-database, which are smaller than the compat
+// scripts they replace; the CDN serves each module whole, unshaken.
+// script.py --lazy-firebase loads it with import() the first time a room is
+// created or joined (see KaataqGame.connect).
+import { initializeApp } from 'https://www.gstatic.com/firebasejs/9.0.0/firebase-app.js';
+import {
+    getDatabase, ref, child, set, update, remove, get, off, runTransaction,
+    onValue, onChildAdded, onChildChanged, onChildRemoved, onDisconnect,
+    serverTimestamp, increment
+} from 'https://www.gstatic.com/firebasejs/9.0.0/firebase-database.js';
+
+const LISTENERS = {
+    value: onValue,
+    child_added: onChildAdded,
+    child_changed: onChildChanged,
+    child_removed: onChildRemoved
+};
+
+class Reference {
+    constructor(node) {
+        this.node = node;
+        this.key = node.key;
+    }
+
+    child(path) {
+        return new Reference(child(this.node, path));
+    }
+
+    set(value) {
+        return set(this.node, value);
+    }
+
+    update(values) {
+        return update(this.node, values);
+    }
+
+    remove() {
+        return remove(this.node);
+    }
+
+    // Resolves to { committed, snapshot } like the compat API
+    transaction(transactionUpdate, onComplete, applyLocally = true) {
+        return runTransaction(this.node, transactionUpdate, { applyLocally: applyLocally }).then((result) => {
+            if (onComplete) onComplete(null, result.committed, result.snapshot);
+            return { committed: result.committed, snapshot: result.snapshot };
+        }, (error) => {
+            if (onComplete) onComplete(error, false, null);
+            throw error;
+        });
+    }
+
+    on(eventType, callback) {
+        if (!LISTENERS[eventType]) {
+            throw new Error(`Unsupported event type: ${eventType}`);
+        }
+        LISTENERS[eventType](this.node, callback);
+        return callback;
+    }
+
+    off(eventType, callback) {
+        off(this.node, eventType, callback);
+    }
+
+    once(eventType) {
+        if (eventType !== 'value') {
+            return Promise.reject(new Error(`Unsupported event type: ${eventType}`));
+        }
+        return get(this.node);
+    }
+
+    onDisconnect() {
+        return onDisconnect(this.node);
+    }
+}
+
+class Database {
+    constructor(sdk) {
+        this.sdk = sdk;
+    }
+
+    ref(path) {
+        return new Reference(ref(this.sdk, path));
+    }
+}
+
+let app = null;
+let database = null;
+
+function databaseFactory() {
+    if (!database) database = new Database(getDatabase(app));
+    return database;
+}
+databaseFactory.ServerValue = {
+    TIMESTAMP: serverTimestamp(),
+    increment: (delta) => increment(delta)
+};
+
+window.firebase = {
+    initializeApp(config) {
+        app = initializeApp(config);
+        return app;
+    },
+    database: databaseFactory
+};
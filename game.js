@@ -1,26 +1,245 @@
 // Firebase-Enabled Kaataq Game Implementation with AI Bot Support
+
+// Only touch the DOM when a value actually changed
+function patchText(el, text) {
+    if (el.textContent !== text) el.textContent = text;
+}
+
+function patchStyle(el, property, value) {
+    if (el.style[property] !== value) el.style[property] = value;
+}
+
+const renderedHtml = new WeakMap();
+
+// Player-entered text (names) going into an HTML template
+function escapeHTML(text) {
+    return String(text ?? '').replace(/[&<>"']/g, char => ({
+        '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+    })[char]);
+}
+
+function patchHTML(el, html) {
+    if (renderedHtml.get(el) !== html) {
+        el.innerHTML = html;
+        renderedHtml.set(el, html);
+    }
+}
+
+// Apply multi-path updates ({'a/b': value}) to a plain object, as update() would
+function applyUpdates(target, updates) {
+    Object.keys(updates).forEach(path => {
+        const parts = path.split('/');
+        const last = parts.pop();
+        let node = target;
+        parts.forEach(part => {
+            if (node[part] === null || typeof node[part] !== 'object') node[part] = {};
+            node = node[part];
+        });
+        if (updates[path] === null) {
+            delete node[last];
+        } else {
+            node[last] = updates[path];
+        }
+    });
+    return target;
+}
+
+// Compact room schema: a history entry keeps short keys and encodes the
+// votes as bitmasks over room.seats (player ids in seat order, see seatsOf):
+//   { r: round, h: holder seat, s: 0 left / 1 right / -1 none,
+//     v: seats that voted, l: seats that voted left, t: timestamp }
+const HANDS = ['left', 'right'];
+
+function compactHistoryEntry(entry, seats) {
+    const compact = {
+        r: entry.round,
+        h: seats.indexOf(entry.holderId),
+        s: HANDS.indexOf(entry.stickChoice),
+        v: 0,
+        l: 0,
+        t: entry.timestamp
+    };
+    Object.keys(entry.votes || {}).forEach(playerId => {
+        const seat = seats.indexOf(playerId);
+        if (seat < 0) return;
+        compact.v |= 1 << seat;
+        if (entry.votes[playerId] === 'left') compact.l |= 1 << seat;
+    });
+    return compact;
+}
+
+// Back to the full shape that bots and the results screen read; full
+// entries pass through unchanged
+function expandHistoryEntry(entry, seats, players) {
+    if (!entry || entry.r === undefined) return entry || null;
+    const votes = {};
+    seats.forEach((playerId, seat) => {
+        if (entry.v & (1 << seat)) votes[playerId] = (entry.l & (1 << seat)) ? 'left' : 'right';
+    });
+    const stickChoice = entry.s >= 0 ? HANDS[entry.s] : null;
+    const holderId = seats[entry.h] || null;
+    return {
+        round: entry.r,
+        holderId: holderId,
+        holderName: players && players[holderId] ? players[holderId].name : null,
+        stickChoice: stickChoice,
+        votes: votes,
+        correctGuessers: Object.keys(votes).filter(playerId => votes[playerId] === stickChoice),
+        timestamp: entry.t
+    };
+}
+
+// gameHistory as a sparse array indexed by round - 1. Once old rounds are
+// archived the database may hand it back as an index-keyed object.
+function historyArray(history) {
+    if (Array.isArray(history)) return history;
+    const items = [];
+    Object.keys(history || {}).forEach(key => { items[Number(key)] = history[key]; });
+    return items;
+}
+
+// Turn order: room.seats lists player ids in the order they joined, and
+// currentHolderIndex indexes into it. A player leaving mid-game keeps their
+// seat (history bitmasks point at seat numbers); seats are only compacted
+// in the lobby. Rooms from before seats existed fall back to join order.
+function seatsOf(roomData) {
+    return roomData.seats || Object.keys(roomData.players || {});
+}
+
+// Player records worth rendering. A disconnect marker that fired after the
+// player was removed leaves a record with no name, only presence fields.
+function listedPlayers(roomData) {
+    return Object.values(roomData.players || {}).filter(player => player && player.name);
+}
+
+// Whether a vote from playerId moves voteCount: only the first one from a
+// player fixed as eligible when voting opened
+function countsVote(roomData, playerId) {
+    return !!(roomData.eligibleVoters || {})[playerId] && !(roomData.votes || {})[playerId];
+}
+
+// The human who takes the room over from leaving: the first one seated,
+// connected players before disconnected ones
+function heirOf(roomData, leaving) {
+    const players = roomData.players || {};
+    const humans = seatsOf(roomData).concat(Object.keys(players)).filter((id, index, ids) =>
+        ids.indexOf(id) === index && id !== leaving && players[id] && !players[id].isBot);
+    return humans.find(id => players[id].connected !== false) || humans[0] || null;
+}
+
+// localStorage key of this browser's room and player, for resuming after a reload
+const SESSION_KEY = 'kaataqSession';
+// localStorage key of the room code length this browser last had to grow to
+const CODE_LENGTH_KEY = 'kaataqRoomCodeLength';
+
+// Keyed list reconciliation: one element per key, created once and then
+// patched in place, so an update only touches the nodes that changed.
+class KeyedList {
+    constructor(container, create, update) {
+        this.container = container;
+        this.create = create; // (item) => element, with element.refs for its parts
+        this.update = update; // (element, item, context) => void
+        this.nodes = new Map();
+    }
+
+    render(items, keyOf, context) {
+        const seen = new Set();
+        let cursor = this.container.firstElementChild;
+
+        items.forEach(item => {
+            const key = keyOf(item);
+            seen.add(key);
+
+            let node = this.nodes.get(key);
+            if (!node) {
+                node = this.create(item);
+                this.nodes.set(key, node);
+            }
+            this.update(node, item, context);
+
+            // Keep DOM order in step with items, moving only misplaced nodes
+            if (node === cursor) {
+                cursor = cursor.nextElementSibling;
+            } else {
+                this.container.insertBefore(node, cursor);
+            }
+        });
+
+        this.nodes.forEach((node, key) => {
+            if (!seen.has(key)) {
+                node.remove();
+                this.nodes.delete(key);
+            }
+        });
+    }
+}
+
 class KaataqGame {
     constructor() {
         // Local UI state (not synced)
         this.gameState = 'welcome';
         this.currentPlayerId = null;
         this.currentRoomId = null;
-        this.timer = null;
+        this.timer = null; // Host-only timeout that closes the current phase
         this.timeRemaining = 0;
+        this.clockFrame = null;
+        this.roundDeadline = null;
+        this.roundPhaseKey = null;
+        this.closedPhaseKey = null;
+        this.votedPhaseKey = null; // Phase this player last voted in
+        this.resultsRound = null;
         this.gameHistory = []; // Track game history for bot AI
         this.botActionTimeouts = new Map(); // Track bot action timeouts
+        this.botPhaseKey = null; // Phase the bots last acted in
+        this.voteRevealKey = null; // Client-side reveal of batched bot votes
+        this.voteRevealAt = new Map();
+        this.lastRevealAt = 0;
+        this.voteRevealTimer = null;
+        this.lastRoomData = null;
+        this.holderCache = null; // Resolved stick holder, see holderOf
+        this.presenceTimer = null;
+        this.seenInRoom = false; // This player has appeared in a room update
+
+        // Local room model fed by the room listeners (see setupRoomListeners);
+        // host actions validate against it (see hostAction)
+        this.room = null;
+        this.roomListeners = []; // [ref, eventType, callback] for teardown
+        this.roomUpdateScheduled = false;
+        this.lists = {}; // Keyed renderers by container id
+        this.roomFields = [
+            'host', 'gameStarted', 'gameEnded', 'currentRound',
+            'currentHolderIndex', 'roundPhase', 'stickChoice',
+            'phaseStartedAt', 'phaseDuration', 'botsManaged', 'seats',
+            'voteCount', 'eligibleVoters', 'roomVersion'
+        ];
 
-        // Firebase database reference
-        this.database = firebase.database();
+        // Firebase database reference, connected on first use (see connect)
+        this.database = null;
+        this.connecting = null;
         this.currentRoomRef = null;
 
+        // Offset between this device's clock and the database server's, so
+        // every client reads the same round deadline
+        this.serverTimeOffset = 0;
+
         // Updated config with bot support
         this.config = {
             minPlayers: 2, // CHANGED: Reduced from 3 to 2
             maxPlayers: 8,
             discussionTime: 45,
             votingTime: 30,
-            maxBots: 6 // Maximum number of bots allowed
+            maxBots: 6, // Maximum number of bots allowed
+            roomCodeLength: 4, // Digits in a new room code; grows when codes keep colliding
+            maxRoomCodeLength: 8, // Longest code the join input accepts
+            roomCodeAttempts: 3, // Taken codes tried at one length before adding a digit
+            roomCodeMemory: 86400000, // Ms new rooms start at the length codes last grew to
+            roomSchema: 'compact', // 'compact': short history entries, no stored bot personalities; 'full': verbose
+            historyHot: 5, // Compact schema: rounds kept in the room, older ones move to roomArchive/
+            botVoteStagger: 1200, // Max ms between revealed bot votes on screen (0: show at once)
+            botClaimTimeout: 45000, // A bot worker claim older than this is considered dead
+            presenceHeartbeat: 30000, // Ms between lastSeenAt refreshes while in a room
+            phaseCloseGrace: 3000, // Ms past a deadline before a non-host closes the phase itself
+            syncMode: 'delta' // 'delta': per-path listeners, 'snapshot': whole room on every change
         };
 
         this.colors = [
@@ -34,6 +253,14 @@ class KaataqGame {
     init() {
         this.bindEvents();
         this.showScreen('welcome');
+
+        // Back from a reload or a crashed tab: take the old seat again
+        const session = this.loadSession();
+        if (session) {
+            this.resumeSession(session).catch((error) => {
+                console.error('Error resuming session:', error);
+            });
+        }
         
         // Ensure bot AI is available
         if (typeof window.botAI === 'undefined') {
@@ -101,9 +328,86 @@ class KaataqGame {
         });
     }
 
+    // Connect to the database the first time a room is created, joined or
+    // resumed, so the welcome screen and info panel never wait for it. Pages
+    // built with script.py --lazy-firebase define window.loadFirebase to
+    // fetch the SDK then; otherwise the page has loaded it already.
+    connect() {
+        if (!this.connecting) {
+            const sdk = window.loadFirebase ? window.loadFirebase() : Promise.resolve(window.firebase);
+            this.connecting = sdk.then((firebase) => {
+                this.database = firebase.database();
+                this.database.ref('.info/serverTimeOffset').on('value', (snapshot) => {
+                    this.serverTimeOffset = snapshot.val() || 0;
+                });
+                return this.database;
+            });
+            // A failed download (offline venue) is retried on the next press
+            this.connecting.catch(() => { this.connecting = null; });
+        }
+        return this.connecting;
+    }
+
     // Utility methods
-    generateRoomCode() {
-        return Math.floor(1000 + Math.random() * 9000).toString();
+    generateRoomCode(length = this.config.roomCodeLength) {
+        const low = Math.pow(10, length - 1);
+        return Math.floor(low + Math.random() * 9 * low).toString();
+    }
+
+    // Claim a code in the roomCodes index, which lists every live room. The
+    // transaction only writes an empty entry, so two hosts can never get the
+    // same room; repeated collisions mean short codes are crowded, so the
+    // code grows by a digit. The length it grew to is remembered for a
+    // while, so the next room starts there instead of repeating the misses.
+    allocateRoomCode(owner, length = this.roomCodeLength(), attempt = 1, grown = false) {
+        const code = this.generateRoomCode(length);
+        return this.database.ref('roomCodes/' + code).transaction((entry) => {
+            if (entry) return; // Taken: abort
+            return { owner: owner, claimedAt: firebase.database.ServerValue.TIMESTAMP };
+        }).then(({ committed }) => {
+            if (committed) {
+                if (grown) this.rememberRoomCodeLength(length);
+                return code;
+            }
+            if (attempt < this.config.roomCodeAttempts) {
+                return this.allocateRoomCode(owner, length, attempt + 1, grown);
+            }
+            if (length >= this.config.maxRoomCodeLength) {
+                throw new Error('No free room codes');
+            }
+            return this.allocateRoomCode(owner, length + 1, 1, true);
+        });
+    }
+
+    // Length to start new codes at: the remembered one until it expires, so
+    // codes shrink again once rooms free up
+    roomCodeLength() {
+        try {
+            const saved = JSON.parse(localStorage.getItem(CODE_LENGTH_KEY));
+            if (saved && Date.now() - saved.at < this.config.roomCodeMemory) {
+                return Math.min(saved.length, this.config.maxRoomCodeLength);
+            }
+        } catch (error) {
+            // Nothing saved, or no localStorage
+        }
+        return this.config.roomCodeLength;
+    }
+
+    rememberRoomCodeLength(length) {
+        try {
+            localStorage.setItem(CODE_LENGTH_KEY, JSON.stringify({ length: length, at: Date.now() }));
+        } catch (error) {
+            // Private browsing: start from the configured length each time
+        }
+    }
+
+    // Delete a closed room with its archived rounds and free its code
+    releaseRoomCode(code) {
+        return this.database.ref().update({
+            ['rooms/' + code]: null,
+            ['roomArchive/' + code]: null,
+            ['roomCodes/' + code]: null
+        });
     }
 
     generatePlayerId() {
@@ -137,87 +441,139 @@ class KaataqGame {
         panel.classList.toggle('hidden');
     }
 
+    // The room as the listeners last delivered it, once it has arrived
+    cachedRoom() {
+        return this.room && this.room.host ? this.room : null;
+    }
+
+    // Host actions validate against the cached room instead of reading it
+    // again (see versionedUpdate)
+    hostAction(prepare) {
+        return this.versionedUpdate(this.cachedRoom(), prepare);
+    }
+
+    // Changes to the room's shape (seats, players, phases) go out as one
+    // multi-path update prepared from a copy of the room and stamped
+    // roomVersion: copy + 1. The database only lets roomVersion move up by
+    // one from its stored value (see version_guard in room_server.py for the
+    // rule), and joins, leaves and results bump it too, so an update built
+    // from a stale room is refused whole rather than overwriting what landed
+    // meanwhile. Only then does prepare run again, on the server's copy,
+    // inside a room transaction. prepare returns the updates, or an error
+    // message to show. Resolves to true once the change is written.
+    versionedUpdate(room, prepare) {
+        if (!this.currentRoomRef || !room) return Promise.resolve(false);
+
+        const updates = prepare(room);
+        if (typeof updates === 'string') {
+            this.showToast(updates, 'error');
+            return Promise.resolve(false);
+        }
+        if (!updates) return Promise.resolve(false);
+
+        const roomRef = this.currentRoomRef;
+        updates.roomVersion = (room.roomVersion || 0) + 1;
+        return roomRef.update(updates).then(() => true, () => {
+            // The cache was stale: validate again against the server's room
+            let error = null;
+            return roomRef.transaction((roomData) => {
+                if (!roomData) return roomData; // no cached value yet: the server will retry us
+                const retry = prepare(roomData);
+                error = typeof retry === 'string' ? retry : null;
+                if (!retry || error) return;
+                applyUpdates(roomData, retry);
+                roomData.roomVersion = (roomData.roomVersion || 0) + 1;
+                return roomData;
+            }).then(({ committed }) => {
+                if (error) this.showToast(error, 'error');
+                return committed;
+            });
+        });
+    }
+
     // NEW: Bot Management Methods
     addBot() {
-        if (!this.currentRoomRef) return;
-
-        this.currentRoomRef.once('value').then((snapshot) => {
-            const roomData = snapshot.val();
-            if (!roomData) return;
+        const room = this.cachedRoom();
+        if (!room) return;
+
+        // Generate bot using bot AI
+        const bot = window.botAI.generateBot(this.currentPlayerId, Object.keys(room.players || {}).length);
+        if (this.config.roomSchema === 'compact') {
+            // Derived from botDifficulty on read, so it needn't sit in every snapshot
+            delete bot.botPersonality;
+        }
 
+        this.hostAction((roomData) => {
             const players = roomData.players || {};
             const playerCount = Object.keys(players).length;
             const botCount = Object.values(players).filter(p => p.isBot).length;
 
             // Check limits
-            if (playerCount >= this.config.maxPlayers) {
-                this.showToast('Room is full!', 'error');
-                return;
-            }
-
-            if (botCount >= this.config.maxBots) {
-                this.showToast('Maximum number of bots reached!', 'error');
-                return;
-            }
+            if (playerCount >= this.config.maxPlayers) return 'Room is full!';
+            if (botCount >= this.config.maxBots) return 'Maximum number of bots reached!';
 
-            // Generate bot using bot AI
-            const bot = window.botAI.generateBot(this.currentPlayerId, playerCount);
-            
-            // Add bot to Firebase
-            const botRef = this.currentRoomRef.child('players/' + bot.id);
-            botRef.set(bot).then(() => {
+            // The version stamp serializes seat changes, so no seats transaction
+            return {
+                ['players/' + bot.id]: bot,
+                seats: seatsOf(roomData).concat([bot.id])
+            };
+        }).then((added) => {
+            if (added) {
                 this.showToast(`Bot ${bot.name} added!`, 'success');
-            }).catch((error) => {
-                console.error('Error adding bot:', error);
-                this.showToast('Error adding bot: ' + error.message, 'error');
-            });
+            } else {
+                window.botAI.removeBotName(bot.name);
+            }
+        }).catch((error) => {
+            window.botAI.removeBotName(bot.name);
+            console.error('Error adding bot:', error);
+            this.showToast('Error adding bot: ' + error.message, 'error');
         });
     }
 
     removeBot(botId) {
-        if (!this.currentRoomRef) return;
-        
-        // Check if current user is host
-        this.currentRoomRef.once('value').then((snapshot) => {
-            const roomData = snapshot.val();
-            if (!roomData || roomData.host !== this.currentPlayerId) {
-                this.showToast('Only the host can remove bots!', 'error');
-                return;
-            }
-
-            const bot = roomData.players[botId];
-            if (!bot || !bot.isBot) {
-                this.showToast('Invalid bot!', 'error');
-                return;
+        let bot = null;
+        this.hostAction((roomData) => {
+            // Check if current user is host
+            if (roomData.host !== this.currentPlayerId) return 'Only the host can remove bots!';
+
+            bot = (roomData.players || {})[botId];
+            if (!bot || !bot.isBot) return 'Invalid bot!';
+
+            // Remove bot from the players, and from the seats while still in the lobby
+            const updates = { ['players/' + botId]: null };
+            if (!roomData.gameStarted) {
+                updates.seats = seatsOf(roomData).filter(playerId => playerId !== botId);
             }
-
+            return updates;
+        }).then((removed) => {
+            if (!removed) return;
             // Remove bot name from used names
             window.botAI.removeBotName(bot.name);
-
-            // Remove bot from Firebase
-            this.currentRoomRef.child('players/' + botId).remove().then(() => {
-                this.showToast(`Bot ${bot.name} removed!`, 'success');
-                
-                // Clear any pending bot actions
-                if (this.botActionTimeouts.has(botId)) {
-                    clearTimeout(this.botActionTimeouts.get(botId));
-                    this.botActionTimeouts.delete(botId);
-                }
-            }).catch((error) => {
-                console.error('Error removing bot:', error);
-                this.showToast('Error removing bot: ' + error.message, 'error');
-            });
+            this.showToast(`Bot ${bot.name} removed!`, 'success');
+        }).catch((error) => {
+            console.error('Error removing bot:', error);
+            this.showToast('Error removing bot: ' + error.message, 'error');
         });
     }
 
     // Room management with Firebase (Updated for bots)
     createRoom() {
+        // The SDK downloads while the name prompt is open
+        const connected = this.connect();
         const playerName = prompt('Enter your name:');
         if (!playerName || !playerName.trim()) return;
 
-        this.currentRoomId = this.generateRoomCode();
         this.currentPlayerId = this.generatePlayerId();
+        connected.then(() => this.allocateRoomCode(this.currentPlayerId)).then((code) => {
+            this.currentRoomId = code;
+            this.setupNewRoom(playerName.trim());
+        }).catch((error) => {
+            console.error('Error creating room:', error);
+            this.showToast('Error creating room: ' + error.message, 'error');
+        });
+    }
 
+    setupNewRoom(playerName) {
         // Create room in Firebase
         const roomData = {
             roomCode: this.currentRoomId,
@@ -230,20 +586,25 @@ class KaataqGame {
             players: {
                 [this.currentPlayerId]: {
                     id: this.currentPlayerId,
-                    name: playerName.trim(),
+                    name: playerName,
                     score: 0,
                     color: this.colors[0],
                     isHost: true,
-                    isBot: false // NEW: Mark as human player
+                    isBot: false, // NEW: Mark as human player
+                    connected: true
                 }
             },
+            seats: [this.currentPlayerId],
             votes: {},
             gameHistory: [], // NEW: Track history for bot AI
+            resolvedRound: 0, // Last round whose scores were written
+            roomVersion: 0, // Bumped by every change to the room's shape (see hostAction)
             createdAt: firebase.database.ServerValue.TIMESTAMP
         };
 
         this.currentRoomRef = this.database.ref('rooms/' + this.currentRoomId);
         this.currentRoomRef.set(roomData).then(() => {
+            this.startPresence();
             this.setupRoomListeners();
             this.showScreen('lobby');
             this.showToast('Room created! Share the code with others.', 'success');
@@ -264,41 +625,52 @@ class KaataqGame {
 
         this.currentRoomId = roomCode;
         this.currentPlayerId = this.generatePlayerId();
-        this.currentRoomRef = this.database.ref('rooms/' + roomCode);
 
         // Check if room exists
-        this.currentRoomRef.once('value').then((snapshot) => {
+        this.connect().then(() => {
+            this.currentRoomRef = this.database.ref('rooms/' + roomCode);
+            return this.currentRoomRef.once('value');
+        }).then((snapshot) => {
             if (!snapshot.exists()) {
                 this.showToast('Room not found!', 'error');
                 return;
             }
 
             const roomData = snapshot.val();
-            if (roomData.gameStarted) {
-                this.showToast('Game already in progress!', 'error');
-                return;
-            }
-
-            const playerCount = roomData.players ? Object.keys(roomData.players).length : 0;
-            if (playerCount >= this.config.maxPlayers) {
-                this.showToast('Room is full!', 'error');
+            // This browser was already in the room: rebind instead of adding a player
+            const session = this.loadSession();
+            if (session && session.roomId === roomCode && (roomData.players || {})[session.playerId]) {
+                this.resumeSession(session);
                 return;
             }
 
-            // Add player to room
-            const playerRef = this.currentRoomRef.child('players/' + this.currentPlayerId);
-            playerRef.set({
+            // Player and seat go out together with the version bump, so a
+            // host action prepared before the join can't drop the seat
+            const player = {
                 id: this.currentPlayerId,
                 name: playerName,
                 score: 0,
-                color: this.colors[playerCount % this.colors.length],
                 isHost: false,
-                isBot: false // NEW: Mark as human player
-            }).then(() => {
+                isBot: false, // NEW: Mark as human player
+                connected: true
+            };
+            return this.versionedUpdate(roomData, (room) => {
+                if (room.gameStarted) return 'Game already in progress!';
+                const playerCount = Object.keys(room.players || {}).length;
+                if (playerCount >= this.config.maxPlayers) return 'Room is full!';
+                return {
+                    ['players/' + player.id]: Object.assign({}, player, {
+                        color: this.colors[playerCount % this.colors.length]
+                    }),
+                    seats: seatsOf(room).concat([player.id])
+                };
+            }).then((joined) => {
+                if (!joined) return;
+                this.startPresence();
                 this.setupRoomListeners();
                 this.showScreen('lobby');
                 this.showToast('Joined room successfully!', 'success');
-            }).catch((error) => {
+            }, (error) => {
                 console.error('Error joining room:', error);
                 this.showToast('Error joining room: ' + error.message, 'error');
             });
@@ -308,24 +680,213 @@ class KaataqGame {
         });
     }
 
-    setupRoomListeners() {
-        if (!this.currentRoomRef) return;
+    // Presence: the database marks this player disconnected when the page
+    // goes away, so room_gc.py can expire players who never come back, and a
+    // heartbeat keeps lastSeenAt fresh while the page is open. The room and
+    // player id are remembered so a reload rebinds to the same player.
+    startPresence() {
+        this.stopHeartbeat();
+        this.seenInRoom = false;
+        this.saveSession();
+        this.heartbeat();
+        this.presenceTimer = setInterval(() => this.heartbeat(), this.config.presenceHeartbeat);
+    }
 
-        // Listen for room updates
-        this.currentRoomRef.on('value', (snapshot) => {
+    stopHeartbeat() {
+        if (this.presenceTimer) {
+            clearInterval(this.presenceTimer);
+            this.presenceTimer = null;
+        }
+    }
+
+    // Presence ends for good: the disconnect marker goes too, since firing
+    // after the player left or was removed it would recreate a partial record
+    stopPresence() {
+        this.stopHeartbeat();
+        if (this.currentRoomRef && this.currentPlayerId) {
+            this.currentRoomRef.child('players/' + this.currentPlayerId).onDisconnect().cancel();
+        }
+    }
+
+    heartbeat() {
+        if (!this.currentRoomRef || !this.currentPlayerId) return;
+        const playerRef = this.currentRoomRef.child('players/' + this.currentPlayerId);
+        // Registered again on every beat: a disconnect that already fired used it up
+        playerRef.onDisconnect().update({
+            connected: false,
+            lastSeenAt: firebase.database.ServerValue.TIMESTAMP
+        });
+        playerRef.update({
+            connected: true,
+            lastSeenAt: firebase.database.ServerValue.TIMESTAMP
+        });
+    }
+
+    // Rebind to this browser's player after a reload or a long disconnect.
+    // The room listeners start from the current room state, so nothing is
+    // replayed and no second player record is created.
+    resumeSession(session) {
+        let roomRef = null;
+        return this.connect().then(() => {
+            roomRef = this.database.ref('rooms/' + session.roomId);
+            return roomRef.child('players/' + session.playerId).once('value');
+        }).then((snapshot) => {
             if (!snapshot.exists()) {
-                this.showToast('Room no longer exists', 'error');
-                this.showScreen('welcome');
-                return;
+                this.clearSession(); // Removed meanwhile, or the room is gone
+                return false;
             }
+            this.currentRoomId = session.roomId;
+            this.currentPlayerId = session.playerId;
+            this.currentRoomRef = roomRef;
+            this.startPresence();
+            this.setupRoomListeners();
+            this.showScreen('lobby');
+            this.showToast('Welcome back to room ' + session.roomId + '!', 'success');
+            return true;
+        });
+    }
 
-            const roomData = snapshot.val();
-            this.gameHistory = roomData.gameHistory || [];
-            this.handleRoomUpdate(roomData);
+    // localStorage can be unavailable (private browsing); resuming is then skipped
+    saveSession() {
+        try {
+            localStorage.setItem(SESSION_KEY, JSON.stringify({
+                roomId: this.currentRoomId,
+                playerId: this.currentPlayerId
+            }));
+        } catch (error) {
+            console.warn('Could not save session:', error);
+        }
+    }
+
+    loadSession() {
+        try {
+            return JSON.parse(localStorage.getItem(SESSION_KEY));
+        } catch (error) {
+            return null;
+        }
+    }
+
+    clearSession() {
+        try {
+            localStorage.removeItem(SESSION_KEY);
+        } catch (error) {
+            // Nothing saved
+        }
+    }
+
+    setupRoomListeners() {
+        if (!this.currentRoomRef) return;
+
+        if (this.config.syncMode === 'snapshot') {
+            // Listen for room updates
+            this.listenToRoom(this.currentRoomRef, 'value', (snapshot) => {
+                if (!snapshot.exists()) {
+                    this.handleRoomRemoved();
+                    return;
+                }
+
+                const roomData = snapshot.val();
+                this.room = roomData;
+                this.gameHistory = historyArray(roomData.gameHistory);
+                this.handleRoomUpdate(roomData);
+            });
+            return;
+        }
+
+        // Delta sync: scalar fields, players, votes and history each get their
+        // own listener, so a single vote only transfers and applies that vote.
+        this.room = { players: {}, votes: {}, gameHistory: [] };
+        this.gameHistory = this.room.gameHistory;
+
+        this.roomFields.forEach(field => {
+            this.listenToRoom(this.currentRoomRef.child(field), 'value', (snapshot) => {
+                // Every room has a host, so a missing host means a missing room
+                if (field === 'host' && !snapshot.exists()) {
+                    this.handleRoomRemoved();
+                    return;
+                }
+                this.room[field] = snapshot.val();
+                this.scheduleRoomUpdate();
+            });
+        });
+
+        ['players', 'votes'].forEach(collection => {
+            const ref = this.currentRoomRef.child(collection);
+            const applyChild = (snapshot) => {
+                this.room[collection][snapshot.key] = snapshot.val();
+                this.scheduleRoomUpdate();
+            };
+            this.listenToRoom(ref, 'child_added', applyChild);
+            this.listenToRoom(ref, 'child_changed', applyChild);
+            this.listenToRoom(ref, 'child_removed', (snapshot) => {
+                delete this.room[collection][snapshot.key];
+                this.scheduleRoomUpdate();
+            });
+        });
+
+        // History is append-only during a game. Old rounds leave from the
+        // front when archived, and everything goes on reset.
+        const historyRef = this.currentRoomRef.child('gameHistory');
+        this.listenToRoom(historyRef, 'child_added', (snapshot) => {
+            this.room.gameHistory[Number(snapshot.key)] = snapshot.val();
+            this.scheduleRoomUpdate();
+        });
+        this.listenToRoom(historyRef, 'child_removed', (snapshot) => {
+            const history = this.room.gameHistory;
+            delete history[Number(snapshot.key)];
+            while (history.length && history[history.length - 1] === undefined) history.length--;
+            this.scheduleRoomUpdate();
         });
     }
 
+    listenToRoom(ref, eventType, callback) {
+        ref.on(eventType, callback);
+        this.roomListeners.push([ref, eventType, callback]);
+    }
+
+    teardownRoomListeners() {
+        this.roomListeners.forEach(([ref, eventType, callback]) => ref.off(eventType, callback));
+        this.roomListeners = [];
+        this.room = null;
+    }
+
+    // Coalesce a burst of deltas into one render per frame
+    scheduleRoomUpdate() {
+        if (this.roomUpdateScheduled) return;
+        this.roomUpdateScheduled = true;
+
+        const run = () => {
+            if (!this.roomUpdateScheduled) return;
+            this.roomUpdateScheduled = false;
+            // Wait until the initial data has arrived
+            if (this.room && this.room.host) {
+                this.handleRoomUpdate(this.room);
+            }
+        };
+        requestAnimationFrame(run);
+        setTimeout(run, 100); // requestAnimationFrame is paused in background tabs
+    }
+
+    handleRoomRemoved() {
+        this.stopPresence();
+        this.clearSession();
+        this.showToast('Room no longer exists', 'error');
+        this.showScreen('welcome');
+    }
+
     handleRoomUpdate(roomData) {
+        const me = (roomData.players || {})[this.currentPlayerId];
+        if (me) {
+            this.seenInRoom = true;
+            // Marked disconnected during a long network drop: we're back
+            if (me.connected === false) this.heartbeat();
+        } else if (this.seenInRoom) {
+            // Removed by room_gc.py; a heartbeat would recreate a partial record
+            this.stopPresence();
+            this.clearSession();
+            this.seenInRoom = false;
+        }
+
         // Update lobby if in lobby screen
         if (this.gameState === 'lobby') {
             this.updateLobby(roomData);
@@ -336,6 +897,8 @@ class KaataqGame {
             this.showScreen('game-screen');
         }
 
+        this.claimAbandonedHost(roomData);
+
         if (this.gameState === 'game-screen') {
             this.updateGameDisplay(roomData);
             this.handleBotActions(roomData); // NEW: Handle bot AI actions
@@ -347,50 +910,46 @@ class KaataqGame {
         }
     }
 
+    // Only the host starts games and rounds, so when the host's tab has been
+    // gone for a heartbeat the first connected human takes the room over
+    claimAbandonedHost(roomData) {
+        const abandoned = (room) => {
+            const host = (room.players || {})[room.host];
+            return !host || (host.connected === false &&
+                this.serverNow() - (host.lastSeenAt || 0) >= this.config.presenceHeartbeat);
+        };
+        if (!roomData.host || !abandoned(roomData)) return;
+        if (heirOf(roomData, roomData.host) !== this.currentPlayerId) return;
+        if (this.hostClaimVersion === roomData.roomVersion) return; // already asked at this version
+        this.hostClaimVersion = roomData.roomVersion;
+
+        this.versionedUpdate(roomData, (room) => {
+            if (!abandoned(room) || heirOf(room, room.host) !== this.currentPlayerId) return null;
+            const updates = { host: this.currentPlayerId, ['players/' + this.currentPlayerId + '/isHost']: true };
+            if ((room.players || {})[room.host]) updates['players/' + room.host + '/isHost'] = false;
+            return updates;
+        }).then((claimed) => {
+            if (claimed) this.showToast('You are now the host', 'success');
+        });
+    }
+
     updateLobby(roomData) {
         document.getElementById('room-code-display').textContent = this.currentRoomId;
 
-        const players = roomData.players || {};
-        const playerCount = Object.keys(players).length;
+        const players = listedPlayers(roomData);
+        const playerCount = players.length;
         document.getElementById('player-count').textContent = playerCount;
 
-        const playersList = document.getElementById('players-list');
-        playersList.innerHTML = '';
-
-        Object.values(players).forEach(player => {
-            const card = document.createElement('div');
-            card.className = 'player-card';
-            if (player.isBot) {
-                card.classList.add('bot-player'); // NEW: Add bot styling class
-            }
-            card.style.borderLeftColor = player.color;
-
-            // NEW: Create bot controls for host
-            const isHost = roomData.host === this.currentPlayerId;
-            const kickButton = (player.isBot && isHost) ? 
-                `<button class="kick-bot-btn" onclick="game.removeBot('${player.id}')">✕</button>` : '';
-
-            card.innerHTML = `
-                <div class="player-avatar" style="background-color: ${player.color}">
-                    ${player.name.charAt(0)}
-                </div>
-                <div class="player-info">
-                    <div class="player-name">
-                        ${player.name}
-                        ${player.isHost ? ' (Host)' : ''}
-                        ${player.isBot ? ` (${player.botDifficulty.toUpperCase()})` : ''}
-                    </div>
-                </div>
-                <div class="player-score">${player.score}</div>
-                ${kickButton}
-            `;
-            playersList.appendChild(card);
-        });
+        const isHost = roomData.host === this.currentPlayerId;
+        const playersList = this.keyedList('players-list',
+            () => this.createLobbyCard(), (card, player, host) => this.updateLobbyCard(card, player, host));
+        if (playersList) {
+            playersList.render(players, player => player.id, isHost);
+        }
 
         // Update start button and bot controls
         const startBtn = document.getElementById('start-game-btn');
         const addBotBtn = document.getElementById('add-bot-btn');
-        const isHost = roomData.host === this.currentPlayerId;
 
         startBtn.disabled = playerCount < this.config.minPlayers || !isHost;
         
@@ -401,82 +960,251 @@ class KaataqGame {
         }
     }
 
+    keyedList(containerId, create, update) {
+        if (!this.lists[containerId]) {
+            const container = document.getElementById(containerId);
+            if (!container) return null;
+            container.innerHTML = '';
+            this.lists[containerId] = new KeyedList(container, create, update);
+        }
+        return this.lists[containerId];
+    }
+
+    createLobbyCard() {
+        const card = document.createElement('div');
+        card.className = 'player-card';
+        card.innerHTML = `
+            <div class="player-avatar"></div>
+            <div class="player-info">
+                <div class="player-name"></div>
+            </div>
+            <div class="player-score"></div>
+            <button class="kick-bot-btn">✕</button>
+        `;
+        card.refs = {
+            avatar: card.querySelector('.player-avatar'),
+            name: card.querySelector('.player-name'),
+            score: card.querySelector('.player-score'),
+            kick: card.querySelector('.kick-bot-btn')
+        };
+        card.refs.kick.addEventListener('click', () => this.removeBot(card.dataset.playerId));
+        return card;
+    }
+
+    updateLobbyCard(card, player, isHost) {
+        const refs = card.refs;
+        card.dataset.playerId = player.id;
+        card.classList.toggle('bot-player', !!player.isBot);
+        card.classList.toggle('disconnected', player.connected === false);
+        patchStyle(card, 'borderLeftColor', player.color);
+        patchStyle(refs.avatar, 'backgroundColor', player.color);
+        patchText(refs.avatar, player.name.charAt(0));
+        patchText(refs.name, player.name +
+            (player.isHost ? ' (Host)' : '') +
+            (player.isBot ? ` (${player.botDifficulty.toUpperCase()})` : ''));
+        patchText(refs.score, String(player.score));
+        // Host can kick bots
+        patchStyle(refs.kick, 'display', (player.isBot && isHost) ? '' : 'none');
+    }
+
+    createGameCard() {
+        const card = document.createElement('div');
+        card.className = 'player-card-game';
+        card.innerHTML = `
+            <div class="player-avatar-small"></div>
+            <div class="player-name-small"></div>
+            <div class="player-score-small"></div>
+            <div class="vote-status"></div>
+        `;
+        card.refs = {
+            avatar: card.querySelector('.player-avatar-small'),
+            name: card.querySelector('.player-name-small'),
+            score: card.querySelector('.player-score-small'),
+            voteStatus: card.querySelector('.vote-status')
+        };
+        return card;
+    }
+
+    updateGameCard(card, player, votes) {
+        const refs = card.refs;
+        card.classList.toggle('bot-player', !!player.isBot);
+        card.classList.toggle('disconnected', player.connected === false);
+        patchStyle(refs.avatar, 'backgroundColor', player.color);
+        patchText(refs.avatar, player.name.charAt(0));
+        patchText(refs.name, player.name + (player.isBot ? ' 🤖' : ''));
+        patchText(refs.score, String(player.score));
+        patchText(refs.voteStatus, votes[player.id] ? '✓' : '');
+    }
+
+    createScoreItem() {
+        const item = document.createElement('div');
+        item.className = 'score-item';
+        item.innerHTML = '<span></span><span></span>';
+        item.refs = { name: item.firstElementChild, points: item.lastElementChild };
+        return item;
+    }
+
+    updateScoreItem(item, entry) {
+        const player = entry.player;
+        item.classList.toggle('bot-player', !!player.isBot);
+        patchText(item.refs.name, `${entry.rank}. ${player.name} ${player.isBot ? '🤖' : ''}`);
+        patchText(item.refs.points, `${player.score || 0} points`);
+    }
+
+    // Room history in the full entry shape, as the bots read it
+    historyView(roomData) {
+        const seats = roomData.seats || [];
+        return historyArray(roomData.gameHistory).map(entry =>
+            expandHistoryEntry(entry, seats, roomData.players));
+    }
+
     // NEW: Handle bot AI actions during gameplay
+    // Batched: every bot decision for a phase is made in one pass and written
+    // with one multi-path update, scheduled at most once per phase.
     handleBotActions(roomData) {
-        if (!roomData.gameStarted) return;
+        if (!roomData.gameStarted || roomData.gameEnded) return;
 
-        const players = roomData.players || {};
-        const currentPlayer = Object.values(players)[roomData.currentHolderIndex];
-
-        // Only the host manages bot actions to prevent conflicts
+        // Only the host manages bot actions to prevent conflicts, unless a
+        // bot worker (bot_worker.py) has claimed the room
         if (roomData.host !== this.currentPlayerId) return;
+        if (this.botsManagedElsewhere(roomData)) {
+            this.clearBotActions();
+            this.botPhaseKey = null;
+            return;
+        }
 
-        if (roomData.roundPhase === 'stick_choice' && currentPlayer?.isBot) {
-            // Bot needs to make stick choice
-            if (!roomData.stickChoice && !this.botActionTimeouts.has(currentPlayer.id)) {
-                const timeout = setTimeout(async () => {
-                    try {
-                        const choice = await window.botAI.makeStickChoice(currentPlayer, this.gameHistory);
-                        this.currentRoomRef.update({
-                            stickChoice: choice,
-                            roundPhase: 'voting'
-                        });
-                        this.startTimer(this.config.votingTime);
-                    } catch (error) {
-                        console.error('Bot stick choice error:', error);
-                    }
-                    this.botActionTimeouts.delete(currentPlayer.id);
-                }, 500);
-                
-                this.botActionTimeouts.set(currentPlayer.id, timeout);
-            }
+        const phaseKey = `${roomData.currentRound}:${roomData.roundPhase}:${roomData.phaseStartedAt}`;
+        if (this.botPhaseKey === phaseKey) return;
+        // A batch still pending belongs to a phase that has ended
+        this.clearBotActions();
+        this.botPhaseKey = phaseKey;
+
+        const players = roomData.players || {};
+        const currentPlayer = this.holderOf(roomData);
+        let act = null;
+        let delay = 0;
+
+        if (roomData.roundPhase === 'stick_choice' && currentPlayer?.isBot && !roomData.stickChoice) {
+            delay = 500 + window.botAI.thinkTime(currentPlayer);
+            act = () => ({
+                stickChoice: window.botAI.chooseStick(currentPlayer, this.historyView(this.lastRoomData || roomData)),
+                ...this.votingPhase(this.lastRoomData || roomData)
+            });
         } else if (roomData.roundPhase === 'voting') {
-            // Bots need to vote
             const votes = roomData.votes || {};
-            Object.values(players).forEach(player => {
-                if (player.isBot && !votes[player.id] && player.id !== currentPlayer?.id) {
-                    if (!this.botActionTimeouts.has(player.id + '_vote')) {
-                        const timeout = setTimeout(async () => {
-                            try {
-                                const guess = await window.botAI.makeGuess(
-                                    player, 
-                                    currentPlayer, 
-                                    this.gameHistory, 
-                                    votes
-                                );
-                                this.currentRoomRef.child('votes/' + player.id).set(guess);
-                            } catch (error) {
-                                console.error('Bot vote error:', error);
-                            }
-                            this.botActionTimeouts.delete(player.id + '_vote');
-                        }, Math.random() * 3000 + 1000);
-                        
-                        this.botActionTimeouts.set(player.id + '_vote', timeout);
-                    }
-                }
+            const bots = Object.values(players).filter(player =>
+                player.isBot && !votes[player.id] && player.id !== currentPlayer?.id);
+            if (bots.length === 0) return;
+
+            delay = Math.random() * 3000 + 1000;
+            act = () => {
+                const guesses = window.botAI.chooseVotes(bots, currentPlayer,
+                    this.historyView(this.lastRoomData || roomData), votes);
+                const latest = this.lastRoomData || roomData;
+                const updates = {};
+                let counted = 0;
+                Object.keys(guesses).forEach(botId => {
+                    updates[`votes/${botId}`] = guesses[botId];
+                    if (countsVote(latest, botId)) counted++;
+                });
+                if (counted) updates.voteCount = firebase.database.ServerValue.increment(counted);
+                return updates;
+            };
+        }
+        if (!act) return;
+
+        const timeout = setTimeout(() => {
+            this.botActionTimeouts.delete('phase');
+            if (!this.currentRoomRef || this.botsManagedElsewhere(this.lastRoomData || roomData)) return;
+            this.currentRoomRef.update(act()).catch((error) => {
+                console.error('Bot action error:', error);
             });
+        }, delay);
+        this.botActionTimeouts.set('phase', timeout);
+    }
+
+    botsManagedElsewhere(roomData) {
+        const claim = roomData.botsManaged;
+        return !!claim && this.serverNow() - (claim.seenAt || 0) < this.config.botClaimTimeout;
+    }
+
+    clearBotActions() {
+        this.botActionTimeouts.forEach(timeout => clearTimeout(timeout));
+        this.botActionTimeouts.clear();
+    }
+
+    // Bot votes land together in one write; reveal them one at a time on
+    // this client only, so the table still looks like bots deciding
+    visibleVotes(roomData) {
+        const votes = roomData.votes || {};
+        const stagger = this.config.botVoteStagger;
+        if (!stagger || roomData.roundPhase !== 'voting') return votes;
+
+        const phaseKey = `${roomData.currentRound}:${roomData.phaseStartedAt}`;
+        if (this.voteRevealKey !== phaseKey) {
+            this.voteRevealKey = phaseKey;
+            this.voteRevealAt = new Map();
+            this.lastRevealAt = 0;
         }
+
+        const players = roomData.players || {};
+        const now = Date.now();
+        const visible = {};
+        let nextReveal = Infinity;
+        Object.keys(votes).forEach(playerId => {
+            if (!players[playerId]?.isBot) {
+                visible[playerId] = votes[playerId];
+                return;
+            }
+            if (!this.voteRevealAt.has(playerId)) {
+                this.lastRevealAt = Math.max(now, this.lastRevealAt) + Math.random() * stagger;
+                this.voteRevealAt.set(playerId, this.lastRevealAt);
+            }
+            const revealAt = this.voteRevealAt.get(playerId);
+            if (revealAt <= now) {
+                visible[playerId] = votes[playerId];
+            } else {
+                nextReveal = Math.min(nextReveal, revealAt);
+            }
+        });
+
+        if (nextReveal !== Infinity && !this.voteRevealTimer) {
+            this.voteRevealTimer = setTimeout(() => {
+                this.voteRevealTimer = null;
+                if (this.gameState === 'game-screen' && this.lastRoomData) {
+                    this.updateGameDisplay(this.lastRoomData);
+                }
+            }, nextReveal - now);
+        }
+        return visible;
     }
 
     startGame() {
-        if (!this.currentRoomRef) return;
-
-        this.currentRoomRef.once('value').then((snapshot) => {
-            const roomData = snapshot.val();
-            if (!roomData || roomData.host !== this.currentPlayerId) return;
+        this.hostAction((roomData) => {
+            if (roomData.host !== this.currentPlayerId || roomData.gameStarted) return null;
 
             const playerCount = Object.keys(roomData.players || {}).length;
             if (playerCount < this.config.minPlayers) {
-                this.showToast(`Need at least ${this.config.minPlayers} players to start!`, 'error');
-                return;
+                return `Need at least ${this.config.minPlayers} players to start!`;
             }
 
-            this.currentRoomRef.update({
-                gameStarted: true,
-                roundPhase: 'stick_choice'
-            }).then(() => {
-                this.startTimer(this.config.discussionTime);
+            // Last chance to compact the seats before history points into them;
+            // players who joined without taking a seat (older clients) go last
+            const players = roomData.players || {};
+            const seats = seatsOf(roomData).filter(playerId => players[playerId]);
+            Object.keys(players).forEach(playerId => {
+                if (!seats.includes(playerId)) seats.push(playerId);
             });
+
+            return {
+                gameStarted: true,
+                seats: seats,
+                currentHolderIndex: 0,
+                roundPhase: 'stick_choice',
+                ...this.phaseTiming(this.config.discussionTime)
+            };
+        }).catch((error) => {
+            console.error('Error starting game:', error);
         });
     }
 
@@ -484,8 +1212,7 @@ class KaataqGame {
         if (!roomData.gameStarted) return;
 
         const players = roomData.players || {};
-        const playersList = Object.values(players);
-        const currentPlayer = playersList[roomData.currentHolderIndex];
+        const currentPlayer = this.holderOf(roomData);
 
         // Update round info
         document.getElementById('round-number').textContent = roomData.currentRound;
@@ -494,23 +1221,28 @@ class KaataqGame {
         // Update current holder display
         const holderDisplay = document.getElementById('current-holder-display');
         if (holderDisplay && currentPlayer) {
-            holderDisplay.innerHTML = `
+            patchHTML(holderDisplay, `
                 <div class="holder-info">
-                    <div class="holder-avatar" style="background-color: ${currentPlayer.color}">
-                        ${currentPlayer.name.charAt(0)}
+                    <div class="holder-avatar" style="background-color: ${escapeHTML(currentPlayer.color)}">
+                        ${escapeHTML(currentPlayer.name.charAt(0))}
                     </div>
-                    <div class="holder-name">${currentPlayer.name}</div>
-                    ${currentPlayer.isBot ? `<div class="bot-indicator">🤖 ${currentPlayer.botDifficulty.toUpperCase()}</div>` : ''}
+                    <div class="holder-name">${escapeHTML(currentPlayer.name)}</div>
+                    ${currentPlayer.isBot ? `<div class="bot-indicator">🤖 ${escapeHTML(currentPlayer.botDifficulty.toUpperCase())}</div>` : ''}
                 </div>
-            `;
+            `);
         }
 
         // Show/hide controls based on phase and player
-        this.updateGameControls(roomData, currentPlayer);
-        this.updatePlayersList(roomData);
+        this.lastRoomData = roomData;
+        const votes = this.visibleVotes(roomData);
+        this.updateGameControls(roomData, currentPlayer, votes);
+        this.updatePlayersList(roomData, votes);
+        this.renderResults(roomData);
+        this.syncRoundClock(roomData);
+        this.closeWhenAllVoted(roomData);
     }
 
-    updateGameControls(roomData, currentPlayer) {
+    updateGameControls(roomData, currentPlayer, votes = roomData.votes || {}) {
         const isCurrentPlayer = currentPlayer?.id === this.currentPlayerId;
         const stickChoiceDiv = document.getElementById('stick-choice');
         const votingDiv = document.getElementById('voting-controls');
@@ -527,10 +1259,10 @@ class KaataqGame {
             } else {
                 if (waitingDiv) {
                     waitingDiv.style.display = 'block';
-                    waitingDiv.innerHTML = `
-                        <p>${currentPlayer?.name} is choosing which hand holds the wee...</p>
+                    patchHTML(waitingDiv, `
+                        <p>${escapeHTML(currentPlayer?.name)} is choosing which hand holds the wee...</p>
                         ${currentPlayer?.isBot ? '<p class="bot-thinking">🤖 Bot is thinking...</p>' : ''}
-                    `;
+                    `);
                 }
             }
         } else if (roomData.roundPhase === 'voting') {
@@ -543,46 +1275,61 @@ class KaataqGame {
             
             if (waitingDiv) {
                 waitingDiv.style.display = 'block';
-                const votes = Object.keys(roomData.votes || {}).length;
-                const totalVoters = Object.values(roomData.players || {}).length - 1; // Exclude holder
-                waitingDiv.innerHTML = `
-                    <p>Votes received: ${votes}/${totalVoters}</p>
+                const eligible = roomData.eligibleVoters ? Object.keys(roomData.eligibleVoters)
+                    : this.eligibleVoters(roomData).map(player => player.id);
+                const voteCount = eligible.filter(id => votes[id]).length;
+                const totalVoters = eligible.length;
+                patchHTML(waitingDiv, `
+                    <p>Votes received: ${voteCount}/${totalVoters}</p>
                     <div class="vote-progress">
-                        <div class="vote-bar" style="width: ${(votes/totalVoters)*100}%"></div>
+                        <div class="vote-bar" style="width: ${totalVoters ? (voteCount / totalVoters) * 100 : 0}%"></div>
                     </div>
-                `;
+                `);
             }
         }
     }
 
-    updatePlayersList(roomData) {
-        const playersListGame = document.getElementById('players-list-game');
-        if (!playersListGame) return;
+    // Everyone but the holder, minus players whose connection dropped, so
+    // the count doesn't wait on them
+    eligibleVoters(roomData) {
+        const holder = this.holderOf(roomData);
+        return Object.values(roomData.players || {})
+            .filter(player => player !== holder && player.connected !== false);
+    }
 
+    // The stick holder. The seat lookup is O(1); the resolved id is cached
+    // until the seats or the index change, so repeated renders of one phase
+    // reuse it.
+    holderOf(roomData) {
+        const seats = seatsOf(roomData);
+        const cache = this.holderCache;
+        if (!cache || cache.seats !== seats || cache.index !== roomData.currentHolderIndex) {
+            this.holderCache = {
+                seats: seats,
+                index: roomData.currentHolderIndex,
+                id: seats[roomData.currentHolderIndex]
+            };
+        }
+        return (roomData.players || {})[this.holderCache.id];
+    }
+
+    // Next seat after the holder that still has a player in it
+    nextHolderIndex(roomData) {
+        const seats = seatsOf(roomData);
         const players = roomData.players || {};
-        playersListGame.innerHTML = '';
+        for (let step = 1; step <= seats.length; step++) {
+            const index = (roomData.currentHolderIndex + step) % seats.length;
+            if (players[seats[index]]) return index;
+        }
+        return 0;
+    }
 
-        Object.values(players).forEach(player => {
-            const card = document.createElement('div');
-            card.className = 'player-card-game';
-            if (player.isBot) {
-                card.classList.add('bot-player');
-            }
+    updatePlayersList(roomData, votes = roomData.votes || {}) {
+        const playersListGame = this.keyedList('players-list-game',
+            () => this.createGameCard(), (card, player, votes) => this.updateGameCard(card, player, votes));
+        if (!playersListGame) return;
 
-            const hasVoted = (roomData.votes || {})[player.id] ? '✓' : '';
-            card.innerHTML = `
-                <div class="player-avatar-small" style="background-color: ${player.color}">
-                    ${player.name.charAt(0)}
-                </div>
-                <div class="player-name-small">
-                    ${player.name}
-                    ${player.isBot ? ' 🤖' : ''}
-                </div>
-                <div class="player-score-small">${player.score}</div>
-                <div class="vote-status">${hasVoted}</div>
-            `;
-            playersListGame.appendChild(card);
-        });
+        playersListGame.render(listedPlayers(roomData), player => player.id, votes);
     }
 
     makeStickChoice(choice) {
@@ -590,178 +1337,326 @@ class KaataqGame {
 
         this.currentRoomRef.update({
             stickChoice: choice,
-            roundPhase: 'voting'
-        }).then(() => {
-            this.startTimer(this.config.votingTime);
+            ...this.votingPhase(this.lastRoomData || {})
         });
     }
 
+    // Opening the voting phase resets the vote counter and fixes who may
+    // vote, as a map of player ids, so the phase closes early only once
+    // each of them is in
+    votingPhase(roomData) {
+        const eligible = {};
+        this.eligibleVoters(roomData).forEach(player => { eligible[player.id] = true; });
+        return {
+            roundPhase: 'voting',
+            ...this.phaseTiming(this.config.votingTime),
+            voteCount: 0,
+            eligibleVoters: eligible
+        };
+    }
+
     castVote(vote) {
         if (!this.currentRoomRef || !this.currentPlayerId) return;
+        // One vote per phase, so the counter moves once per player
+        if (this.votedPhaseKey === this.roundPhaseKey) return;
+        this.votedPhaseKey = this.roundPhaseKey;
+
+        const updates = { ['votes/' + this.currentPlayerId]: vote };
+        // A tab that reloaded mid-phase may vote again, but counts once
+        if (countsVote(this.lastRoomData || {}, this.currentPlayerId)) {
+            updates.voteCount = firebase.database.ServerValue.increment(1);
+        }
+        this.currentRoomRef.update(updates);
+    }
 
-        this.currentRoomRef.child('votes/' + this.currentPlayerId).set(vote);
+    // Round clock: each timed phase stores a server timestamp and a duration
+    // in the room. Every client renders the same deadline from them and
+    // closes the phase when it passes, the host first and everyone else a
+    // grace period later, in case the host is gone. showResults scores a
+    // round once however many clients try.
+    phaseTiming(seconds) {
+        return {
+            phaseStartedAt: firebase.database.ServerValue.TIMESTAMP,
+            phaseDuration: seconds
+        };
     }
 
-    startTimer(seconds) {
-        this.timeRemaining = seconds;
-        this.updateTimerDisplay();
+    serverNow() {
+        return Date.now() + this.serverTimeOffset;
+    }
 
-        this.timer = setInterval(() => {
-            this.timeRemaining--;
+    syncRoundClock(roomData) {
+        const timed = roomData.gameStarted && !roomData.gameEnded &&
+            (roomData.roundPhase === 'stick_choice' || roomData.roundPhase === 'voting') &&
+            typeof roomData.phaseStartedAt === 'number' && roomData.phaseDuration > 0;
+        const deadline = timed ? roomData.phaseStartedAt + roomData.phaseDuration * 1000 : null;
+        const phaseKey = `${roomData.currentRound}:${roomData.roundPhase}:${roomData.phaseStartedAt}`;
+        if (deadline === this.roundDeadline && phaseKey === this.roundPhaseKey) return;
+
+        this.stopRoundClock();
+        this.roundDeadline = deadline;
+        this.roundPhaseKey = phaseKey;
+        if (deadline === null) {
             this.updateTimerDisplay();
+            return;
+        }
 
-            if (this.timeRemaining <= 0) {
-                clearInterval(this.timer);
-                this.handleTimeUp();
-            }
-        }, 1000);
+        this.renderRoundClock();
+        // A timeout rather than a frame loop: it still fires in a background tab
+        const round = roomData.currentRound;
+        const grace = roomData.host === this.currentPlayerId ? 0 : this.config.phaseCloseGrace;
+        this.timer = setTimeout(() => this.handleTimeUp(phaseKey, round),
+            Math.max(0, deadline + grace - this.serverNow()));
+    }
+
+    renderRoundClock() {
+        this.clockFrame = null;
+        if (this.roundDeadline === null) return;
+
+        const remaining = Math.max(0, Math.ceil((this.roundDeadline - this.serverNow()) / 1000));
+        if (remaining !== this.timeRemaining) {
+            this.timeRemaining = remaining;
+            this.updateTimerDisplay();
+        }
+        if (remaining > 0) {
+            this.clockFrame = requestAnimationFrame(() => this.renderRoundClock());
+        }
+    }
+
+    stopRoundClock() {
+        if (this.timer) {
+            clearTimeout(this.timer);
+            this.timer = null;
+        }
+        if (this.clockFrame) {
+            cancelAnimationFrame(this.clockFrame);
+            this.clockFrame = null;
+        }
+        this.roundDeadline = null;
+        this.roundPhaseKey = null;
+        this.timeRemaining = 0;
     }
 
     updateTimerDisplay() {
         const timerDisplay = document.getElementById('timer');
         if (timerDisplay) {
-            timerDisplay.textContent = this.timeRemaining;
+            patchText(timerDisplay, this.roundDeadline === null ? '--' : String(this.timeRemaining));
         }
     }
 
-    handleTimeUp() {
-        // Auto-proceed to results when time is up
-        this.showResults();
-    }
+    handleTimeUp(phaseKey, round) {
+        // Close each phase once, however many room updates arrive meanwhile
+        if (this.closedPhaseKey === phaseKey) return;
+        this.closedPhaseKey = phaseKey;
 
-    showResults() {
-        if (!this.currentRoomRef) return;
+        // Auto-proceed to results when time is up or every vote is in
+        this.showResults(round);
+    }
 
-        this.currentRoomRef.once('value').then((snapshot) => {
-            const roomData = snapshot.val();
-            if (!roomData) return;
+    // Every first vote from an eligible player increments voteCount on the
+    // server, so the host sees a complete phase from one counter and closes
+    // it without waiting for the timer. Clients count from their own copy,
+    // which can be stale, so a full counter is confirmed against the votes
+    // before closing. showResults' transaction still scores the round
+    // exactly once.
+    closeWhenAllVoted(roomData) {
+        if (roomData.host !== this.currentPlayerId || roomData.roundPhase !== 'voting') return;
+        const eligible = Object.keys(roomData.eligibleVoters || {});
+        if (!eligible.length || (roomData.voteCount || 0) < eligible.length) return;
+        const votes = roomData.votes || {};
+        if (!eligible.every(id => votes[id])) return;
+        const phaseKey = `${roomData.currentRound}:${roomData.roundPhase}:${roomData.phaseStartedAt}`;
+        this.handleTimeUp(phaseKey, roomData.currentRound);
+    }
 
-            const players = roomData.players || {};
-            const votes = roomData.votes || {};
-            const currentPlayer = Object.values(players)[roomData.currentHolderIndex];
-            const stickChoice = roomData.stickChoice;
+    showResults(round) {
+        if (!this.currentRoomRef) return;
 
-            // Calculate results
-            const leftVotes = Object.values(votes).filter(v => v === 'left').length;
-            const rightVotes = Object.values(votes).filter(v => v === 'right').length;
-            const correctGuessers = Object.keys(votes).filter(playerId => votes[playerId] === stickChoice);
+        // Resolve the round in one transaction keyed on currentRound: the first
+        // commit writes scores and history, and any retry or later attempt
+        // sees resolvedRound and aborts, so a round is scored exactly once.
+        // Rounds already copied to the archive leave the room in the same commit.
+        this.archiveColdHistory().then((archived) => this.currentRoomRef.transaction((roomData) => {
+            if (!roomData) return roomData; // no cached value yet: the server will retry us
+            if (round !== undefined && roomData.currentRound !== round) return;
+            if ((roomData.resolvedRound || 0) >= roomData.currentRound) return;
+            if (roomData.roundPhase !== 'stick_choice' && roomData.roundPhase !== 'voting') return;
+
+            const updates = this.resolveRound(roomData);
+            archived.forEach(index => { updates[`gameHistory/${index}`] = null; });
+            applyUpdates(roomData, updates);
+            roomData.roomVersion = (roomData.roomVersion || 0) + 1;
+            return roomData;
+        }, null, false)).catch((error) => {
+            console.error('Error resolving round:', error);
+        });
+    }
 
-            // Update scores
-            const updates = {};
-            
-            // Holder gets points if fewer than half guessed correctly
-            const totalVotes = leftVotes + rightVotes;
-            if (correctGuessers.length < totalVotes / 2) {
-                updates[`players/${currentPlayer.id}/score`] = (players[currentPlayer.id].score || 0) + 1;
-            }
+    // Compact schema: copy the rounds about to fall out of the hot window to
+    // roomArchive/<room>/gameHistory. Resolves to the indices now safe to
+    // drop from the room; entries never change, so copying twice is harmless.
+    archiveColdHistory() {
+        if (this.config.roomSchema !== 'compact') return Promise.resolve([]);
+
+        const history = historyArray(this.room ? this.room.gameHistory : this.gameHistory);
+        const keepFrom = history.length + 1 - this.config.historyHot; // counting the round being resolved
+        const archive = {};
+        history.forEach((entry, index) => {
+            if (entry && index < keepFrom) archive[index] = entry;
+        });
+        const indices = Object.keys(archive);
+        if (indices.length === 0) return Promise.resolve([]);
 
-            // Correct guessers get points
-            correctGuessers.forEach(playerId => {
-                if (playerId !== currentPlayer.id) {
-                    updates[`players/${playerId}/score`] = (players[playerId].score || 0) + 1;
-                }
+        return this.database.ref(`roomArchive/${this.currentRoomId}/gameHistory`).update(archive)
+            .then(() => indices, (error) => {
+                console.error('Error archiving history:', error);
+                return []; // keep them in the room rather than lose them
             });
+    }
 
-            // Add to game history for bot AI
-            const roundResult = {
-                round: roomData.currentRound,
-                holderId: currentPlayer.id,
-                holderName: currentPlayer.name,
-                stickChoice: stickChoice,
-                votes: votes,
-                correctGuessers: correctGuessers,
-                timestamp: Date.now()
-            };
-            updates[`gameHistory/${roomData.currentRound - 1}`] = roundResult;
-
-            // Update round phase
-            updates.roundPhase = 'results';
-            updates.votes = {};
+    // Score a round: returns the multi-path updates that close it
+    resolveRound(roomData) {
+        const players = roomData.players || {};
+        const votes = roomData.votes || {};
+        // The holder may have left mid-game: the round still resolves, with
+        // no holder point and no holder seat in the history (h: -1)
+        const currentPlayer = this.holderOf(roomData);
+        const holderId = currentPlayer && players[currentPlayer.id] ? currentPlayer.id : null;
+        const stickChoice = roomData.stickChoice;
+
+        // Calculate results
+        const leftVotes = Object.values(votes).filter(v => v === 'left').length;
+        const rightVotes = Object.values(votes).filter(v => v === 'right').length;
+        const correctGuessers = Object.keys(votes).filter(playerId => votes[playerId] === stickChoice);
+
+        // Update scores
+        const updates = {};
+
+        // Holder gets points if fewer than half guessed correctly
+        const totalVotes = leftVotes + rightVotes;
+        if (holderId && correctGuessers.length < totalVotes / 2) {
+            updates[`players/${holderId}/score`] = (players[holderId].score || 0) + 1;
+        }
 
-            this.currentRoomRef.update(updates).then(() => {
-                this.displayResults(roomData, stickChoice, leftVotes, rightVotes, correctGuessers);
-            });
+        // Correct guessers get points
+        correctGuessers.forEach(playerId => {
+            if (playerId !== holderId && players[playerId]) {
+                updates[`players/${playerId}/score`] = (players[playerId].score || 0) + 1;
+            }
         });
+
+        // Add to game history for bot AI
+        const roundResult = {
+            round: roomData.currentRound,
+            holderId: holderId,
+            holderName: holderId ? currentPlayer.name : null,
+            stickChoice: stickChoice,
+            votes: votes,
+            correctGuessers: correctGuessers,
+            timestamp: Date.now()
+        };
+        updates[`gameHistory/${roomData.currentRound - 1}`] = this.config.roomSchema === 'compact' ?
+            compactHistoryEntry(roundResult, seatsOf(roomData)) : roundResult;
+
+        // Update round phase
+        updates.roundPhase = 'results';
+        updates.votes = {};
+        updates.resolvedRound = roomData.currentRound;
+        return updates;
+    }
+
+    // Every client shows the results of the round from its history entry
+    renderResults(roomData) {
+        const resultsDiv = document.getElementById('results-display');
+        const nextBtn = document.getElementById('next-round-btn');
+        const round = roomData.roundPhase === 'results' ? roomData.currentRound : null;
+        const result = round !== null ? expandHistoryEntry(historyArray(roomData.gameHistory)[round - 1],
+            seatsOf(roomData), roomData.players) : null;
+
+        if (!result) {
+            if (resultsDiv) resultsDiv.style.display = 'none';
+            if (nextBtn) nextBtn.style.display = 'none';
+            this.resultsRound = null;
+            return;
+        }
+        if (this.resultsRound === round) return;
+        this.resultsRound = round;
+
+        const votes = Object.values(result.votes || {});
+        const leftVotes = votes.filter(v => v === 'left').length;
+        const rightVotes = votes.filter(v => v === 'right').length;
+        this.displayResults(roomData, result.stickChoice, leftVotes, rightVotes,
+            result.correctGuessers || [], roomData.host === this.currentPlayerId);
     }
 
-    displayResults(roomData, stickChoice, leftVotes, rightVotes, correctGuessers) {
+    displayResults(roomData, stickChoice, leftVotes, rightVotes, correctGuessers, showNextButton) {
         const resultsDiv = document.getElementById('results-display');
         if (!resultsDiv) return;
 
         const players = roomData.players || {};
-        const currentPlayer = Object.values(players)[roomData.currentHolderIndex];
+        const currentPlayer = this.holderOf(roomData);
 
         resultsDiv.innerHTML = `
             <div class="round-results">
-                <h3>Round ${roomData.currentRound} Results</h3>
+                <h3>Round ${escapeHTML(roomData.currentRound)} Results</h3>
                 <div class="stick-reveal">
-                    <p>The wee was in the <strong>${stickChoice}</strong> hand!</p>
+                    <p>The wee was in the <strong>${escapeHTML(stickChoice)}</strong> hand!</p>
                 </div>
                 <div class="vote-summary">
                     <p>Left: ${leftVotes} votes | Right: ${rightVotes} votes</p>
                 </div>
                 <div class="correct-guessers">
-                    <p>Correct guessers: ${correctGuessers.map(id => players[id]?.name).join(', ') || 'None'}</p>
+                    <p>Correct guessers: ${correctGuessers.map(id => escapeHTML(players[id]?.name)).join(', ') || 'None'}</p>
                 </div>
             </div>
         `;
 
         resultsDiv.style.display = 'block';
 
-        // Show next round button after delay
+        // Show next round button after delay (the host advances the round)
+        if (!showNextButton) return;
+        const round = roomData.currentRound;
         setTimeout(() => {
             const nextBtn = document.getElementById('next-round-btn');
-            if (nextBtn) nextBtn.style.display = 'block';
+            if (nextBtn && this.resultsRound === round) nextBtn.style.display = 'block';
         }, 3000);
     }
 
     nextRound() {
-        if (!this.currentRoomRef) return;
-
-        this.currentRoomRef.once('value').then((snapshot) => {
-            const roomData = snapshot.val();
-            if (!roomData) return;
+        this.hostAction((roomData) => {
+            // A second click, or another tab, already moved the round on
+            if (roomData.roundPhase !== 'results') return null;
 
             const players = Object.values(roomData.players || {});
-            const nextHolderIndex = (roomData.currentHolderIndex + 1) % players.length;
             const maxScore = Math.max(...players.map(p => p.score || 0));
 
             // Check for game end (first to 5 points or after 10 rounds)
             if (maxScore >= 5 || roomData.currentRound >= 10) {
-                this.endGame();
-                return;
+                return {
+                    gameEnded: true,
+                    roundPhase: 'finished'
+                };
             }
 
             // Start next round
-            this.currentRoomRef.update({
+            return {
                 currentRound: roomData.currentRound + 1,
-                currentHolderIndex: nextHolderIndex,
+                currentHolderIndex: this.nextHolderIndex(roomData),
                 roundPhase: 'stick_choice',
                 stickChoice: null,
-                votes: {}
-            }).then(() => {
-                // Hide results and next button
-                const resultsDiv = document.getElementById('results-display');
-                const nextBtn = document.getElementById('next-round-btn');
-                if (resultsDiv) resultsDiv.style.display = 'none';
-                if (nextBtn) nextBtn.style.display = 'none';
-
-                this.startTimer(this.config.discussionTime);
-            });
-        });
-    }
-
-    endGame() {
-        if (!this.currentRoomRef) return;
-
-        this.currentRoomRef.update({
-            gameEnded: true,
-            roundPhase: 'finished'
+                votes: {},
+                voteCount: null,
+                eligibleVoters: null,
+                ...this.phaseTiming(this.config.discussionTime)
+            };
+        }).catch((error) => {
+            console.error('Error starting next round:', error);
         });
     }
 
     showEndScreen(roomData) {
         this.showScreen('end-screen');
+        this.stopRoundClock();
 
         const players = Object.values(roomData.players || {});
         const sortedPlayers = players.sort((a, b) => (b.score || 0) - (a.score || 0));
@@ -769,36 +1664,26 @@ class KaataqGame {
 
         document.getElementById('winner-name').textContent = winner?.name || 'Unknown';
 
-        const finalScores = document.getElementById('final-scores');
+        const finalScores = this.keyedList('final-scores',
+            () => this.createScoreItem(), (item, entry) => this.updateScoreItem(item, entry));
         if (finalScores) {
-            finalScores.innerHTML = sortedPlayers.map((player, index) => `
-                <div class="score-item ${player.isBot ? 'bot-player' : ''}">
-                    <span>${index + 1}. ${player.name} ${player.isBot ? '🤖' : ''}</span>
-                    <span>${player.score || 0} points</span>
-                </div>
-            `).join('');
+            finalScores.render(sortedPlayers.map((player, index) => ({ player, rank: index + 1 })),
+                entry => entry.player.id);
         }
 
         // Clear all bot timeouts
-        this.botActionTimeouts.forEach(timeout => clearTimeout(timeout));
-        this.botActionTimeouts.clear();
+        this.clearBotActions();
     }
 
     resetGame() {
-        if (this.timer) {
-            clearInterval(this.timer);
-            this.timer = null;
-        }
+        this.stopRoundClock();
 
         // Clear bot timeouts
-        this.botActionTimeouts.forEach(timeout => clearTimeout(timeout));
-        this.botActionTimeouts.clear();
-
-        if (!this.currentRoomRef) return;
+        this.clearBotActions();
+        this.botPhaseKey = null;
 
-        this.currentRoomRef.once('value').then((snapshot) => {
-            const roomData = snapshot.val();
-            if (!roomData || roomData.host !== this.currentPlayerId) return;
+        this.hostAction((roomData) => {
+            if (roomData.host !== this.currentPlayerId) return null;
 
             // Reset scores but keep players
             const updates = {};
@@ -812,35 +1697,65 @@ class KaataqGame {
             updates.currentHolderIndex = 0;
             updates.roundPhase = 'waiting';
             updates.stickChoice = null;
+            updates.phaseStartedAt = null;
+            updates.phaseDuration = null;
+            updates.resolvedRound = 0;
             updates.votes = {};
+            updates.voteCount = null;
+            updates.eligibleVoters = null;
             updates.gameHistory = [];
-
-            this.currentRoomRef.update(updates).then(() => {
-                this.showScreen('lobby');
-            });
+            return updates;
+        }).then((reset) => {
+            if (!reset) return;
+            this.showScreen('lobby');
+            this.database.ref('roomArchive/' + this.currentRoomId).remove();
+        }).catch((error) => {
+            console.error('Error resetting game:', error);
         });
     }
 
     leaveRoom() {
         if (this.currentRoomRef && this.currentPlayerId) {
-            // Remove player from room
-            this.currentRoomRef.child('players/' + this.currentPlayerId).remove();
+            // Remove player from room; the last human out closes it and frees the code
+            const roomId = this.currentRoomId;
+            const playerId = this.currentPlayerId;
+            this.stopPresence();
+            this.clearSession();
+            this.currentRoomRef.transaction((roomData) => {
+                if (!roomData) return roomData;
+                if (roomData.host === playerId) {
+                    // Hand the room over, or nobody could start the next round
+                    const heir = heirOf(roomData, playerId);
+                    if (heir) {
+                        roomData.host = heir;
+                        roomData.players[heir].isHost = true;
+                    }
+                }
+                if (roomData.players) delete roomData.players[playerId];
+                if (!roomData.gameStarted && roomData.seats) {
+                    roomData.seats = roomData.seats.filter(id => id !== playerId);
+                }
+                roomData.roomVersion = (roomData.roomVersion || 0) + 1;
+                const humans = Object.values(roomData.players || {}).filter(player => !player.isBot);
+                return humans.length ? roomData : null;
+            }).then(({ committed, snapshot }) => {
+                if (committed && !snapshot.exists()) this.releaseRoomCode(roomId);
+            }).catch((error) => {
+                console.error('Error leaving room:', error);
+            });
             
             // Clean up listeners
-            this.currentRoomRef.off();
+            this.teardownRoomListeners();
             this.currentRoomRef = null;
             this.currentRoomId = null;
             this.currentPlayerId = null;
         }
 
         // Clear timers and bot actions
-        if (this.timer) {
-            clearInterval(this.timer);
-            this.timer = null;
-        }
+        this.stopRoundClock();
 
-        this.botActionTimeouts.forEach(timeout => clearTimeout(timeout));
-        this.botActionTimeouts.clear();
+        this.clearBotActions();
+        this.botPhaseKey = null;
 
         this.showScreen('welcome');
     }
@@ -0,0 +1,559 @@
+# Kaataq load test
+#
+# Runs hundreds of simulated rooms against a local room server. Virtual
+# players follow the same protocol as KaataqGame in the browser: createRoom,
+# joinRoom, startGame, stick choice, votes, showResults (a room transaction)
+# and nextRound. Each player listens with the same event streams as the
+# delta sync in game.js. The report gives action-to-broadcast latency
+# percentiles, reads and writes per round, and bytes per client, to base
+# capacity planning on numbers.
+#
+#     python load_test.py --rooms 200 --players 4
+#     python load_test.py --url http://127.0.0.1:8765/db --rooms 50 --think 2
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import bot_ai
+from room_client import TIMESTAMP, RoomClient, RoomClientError, increment
+from room_codes import RoomCodeAllocator
+from room_server import Database
+
+# Per-path listeners opened by setupRoomListeners in delta sync mode
+ROOM_FIELDS = [
+    'host', 'gameStarted', 'gameEnded', 'currentRound',
+    'currentHolderIndex', 'roundPhase', 'stickChoice',
+    'phaseStartedAt', 'phaseDuration', 'botsManaged', 'seats',
+    'voteCount', 'eligibleVoters', 'roomVersion'
+]
+COLLECTIONS = ['players', 'votes', 'gameHistory']
+
+DISCUSSION_TIME = 45  # game.js config
+VOTING_TIME = 30
+HISTORY_HOT = 5
+FRAME_SECONDS = 1 / 60
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def apply_updates(target, updates):
+    """Python applyUpdates: write multi-path updates into a plain dict."""
+    for path, value in updates.items():
+        parts = path.split('/')
+        node = target
+        for part in parts[:-1]:
+            child = node.get(part)
+            if isinstance(child, list):  # exported arrays are index-keyed objects underneath
+                child = {str(index): item for index, item in enumerate(child) if item is not None}
+            if not isinstance(child, dict):
+                child = {}
+            node[part] = child
+            node = child
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = value
+
+
+def resolve_round(room):
+    """KaataqGame.resolveRound (compact schema): the updates that score and
+    close a round."""
+    players = room.get('players') or {}
+    votes = room.get('votes') or {}
+    holder = bot_ai.holder_of(room)  # None once the holder has left
+    holder_id = holder['id'] if holder else None
+    scores, _ = bot_ai.score_round(players, votes, holder_id, room.get('stickChoice'))
+    updates = {f'players/{player_id}/score': score for player_id, score in scores.items()}
+    updates[f"gameHistory/{room['currentRound'] - 1}"] = bot_ai.compact_history_entry({
+        'round': room['currentRound'],
+        'holderId': holder_id,
+        'stickChoice': room.get('stickChoice'),
+        'votes': votes,
+        'timestamp': int(time.time() * 1000),
+    }, bot_ai.seats_of(room))
+    updates['roundPhase'] = 'results'
+    updates['votes'] = None
+    updates['resolvedRound'] = room['currentRound']
+    return updates
+
+
+class Metrics:
+    def __init__(self):
+        self.latencies = defaultdict(list)  # action -> seconds until each other client saw it
+        self.reads = 0
+        self.writes = 0
+        self.rounds = 0
+        self.games = 0
+        self.errors = 0
+        self.version_conflicts = 0  # versioned updates refused on a changed room
+
+
+class Expectation:
+    """A write whose effect every other player in the room should see."""
+
+    def __init__(self, action, predicate, waiting):
+        self.action = action
+        self.predicate = predicate
+        self.waiting = set(waiting)
+        self.started = time.perf_counter()
+
+
+class VirtualPlayer:
+    def __init__(self, room, index, url):
+        self.room = room
+        self.index = index
+        self.id = f'player_{room.code}_{index}'
+        self.name = f'Load {index}'
+        self.client = RoomClient(url, pool_size=1)
+        self.mirror = Database()
+        self.changed = asyncio.Event()
+        self.acted = set()  # (phase key, action) pairs this player already did
+        self.streams = []
+
+    @property
+    def state(self):
+        return self.mirror.get([]) or {}
+
+    async def listen(self):
+        """Open one stream per field and collection, like the delta listeners."""
+        ready = []
+        for field in ROOM_FIELDS + COLLECTIONS:
+            started = asyncio.Event()
+            ready.append(started)
+            self.streams.append(asyncio.ensure_future(self.follow(field, started)))
+        await asyncio.gather(*(started.wait() for started in ready))
+
+    async def follow(self, field, started):
+        async for event, parts, data in self.client.listen(f'rooms/{self.room.code}/{field}'):
+            if event == 'put':
+                self.mirror.set([field] + parts, data)
+            else:
+                self.mirror.update([field] + parts, data)
+            started.set()
+            self.room.observe(self)
+            self.changed.set()
+
+    async def close(self):
+        for stream in self.streams:
+            stream.cancel()
+        await asyncio.gather(*self.streams, return_exceptions=True)
+        await self.client.close()
+
+    # Requests, counted like the browser's Firebase traffic
+
+    async def read(self, path=''):
+        self.room.metrics.reads += 1
+        return await self.client.get(f'rooms/{self.room.code}{path}')
+
+    async def write(self, action, predicate, request):
+        # Only players already listening can see the broadcast; a later
+        # joiner gets the value in its initial snapshot instead
+        others = [player.id for player in self.room.players
+                  if player is not self and player.streams]
+        if others:
+            self.room.expectations.append(Expectation(action, predicate, others))
+        self.room.metrics.writes += 1
+        await request
+
+
+class VirtualRoom:
+    def __init__(self, code, size, games, url, think, metrics, rng):
+        self.code = code
+        self.games = games
+        self.think = think
+        self.metrics = metrics
+        self.rng = rng
+        self.players = [VirtualPlayer(self, index, url) for index in range(size)]
+        self.expectations = []
+        self.done = False
+
+    def observe(self, player):
+        state = None
+        for expectation in list(self.expectations):
+            if player.id not in expectation.waiting:
+                continue
+            state = state if state is not None else player.state
+            if expectation.predicate(state):
+                expectation.waiting.discard(player.id)
+                self.metrics.latencies[expectation.action].append(
+                    time.perf_counter() - expectation.started)
+                if not expectation.waiting:
+                    self.expectations.remove(expectation)
+
+    async def pause(self):
+        await asyncio.sleep(self.rng.uniform(0, self.think))
+
+    async def run(self):
+        host, guests = self.players[0], self.players[1:]
+        try:
+            await self.create(host)
+            for guest in guests:
+                await self.join(guest)
+            await asyncio.gather(*(self.play(player) for player in self.players))
+        finally:
+            await asyncio.gather(*(player.close() for player in self.players))
+
+    async def create(self, host):
+        await host.write('create', lambda room: True, host.client.set(f'rooms/{self.code}', {
+            'roomCode': self.code,
+            'host': host.id,
+            'gameStarted': False,
+            'currentRound': 1,
+            'currentHolderIndex': 0,
+            'roundPhase': 'waiting',
+            'players': {host.id: self.player_record(host, True)},
+            'seats': [host.id],
+            'resolvedRound': 0,
+            'roomVersion': 0,
+            'createdAt': TIMESTAMP,
+        }))
+        await host.listen()
+
+    async def join(self, guest):
+        await self.pause()
+        room = await guest.read()  # joinRoom checks the room with once('value')
+
+        def prepare(room):
+            if guest.id in (room.get('players') or {}):
+                return None
+            return {f'players/{guest.id}': self.player_record(guest, False),
+                    'seats': bot_ai.seats_of(room) + [guest.id]}
+
+        # The player record and the seat go out in one versioned update
+        await guest.write('join', lambda room: guest.id in bot_ai.seats_of(room),
+                          self.versioned_update(guest, room or {}, prepare))
+        await guest.listen()
+
+    def player_record(self, player, is_host):
+        return {'id': player.id, 'name': player.name, 'score': 0,
+                'color': '#FF6B6B', 'isHost': is_host, 'isBot': False}
+
+    async def play(self, player):
+        """React to room changes the way one browser tab does."""
+        while not self.done:
+            await player.changed.wait()
+            # Fields arrive on separate streams; like scheduleRoomUpdate, let
+            # a frame's worth of them land before acting on the state
+            await asyncio.sleep(FRAME_SECONDS)
+            player.changed.clear()
+            try:
+                await self.react(player, player.state)
+            except Exception as error:  # keep the rest of the run going
+                self.metrics.errors += 1
+                print(f"❌ Room {self.code}: {error}")
+                self.done = True
+            if self.done:
+                for other in self.players:
+                    other.changed.set()  # wake the others so they stop too
+
+    async def react(self, player, room):
+        is_host = player is self.players[0]
+        players = list((room.get('players') or {}).values())
+        phase = room.get('roundPhase')
+        current_round = room.get('currentRound')
+        phase_key = f"{self.games}:{current_round}:{phase}:{room.get('phaseStartedAt')}"
+        if len(players) < len(self.players):
+            return
+
+        def once(action):
+            # Each action at most once per phase, however many updates arrive
+            if (phase_key, action) in player.acted:
+                return False
+            player.acted.add((phase_key, action))
+            return True
+        holder = bot_ai.holder_of(room)
+
+        if room.get('gameEnded'):
+            # A reset's fields arrive on separate streams: a stale gameEnded
+            # next to gameStarted False is the reset landing, not a new finish
+            if is_host and room.get('gameStarted') and once('finish'):
+                await self.finish_game(player)
+        elif not room.get('gameStarted'):
+            if is_host and once('start'):
+                await self.start_game(player)
+        elif phase == 'stick_choice' and holder['id'] == player.id and not room.get('stickChoice'):
+            if not once('stick'):
+                return
+            await self.pause()
+            await player.write('stickChoice',
+                               lambda r: r.get('roundPhase') == 'voting' and r.get('currentRound') == current_round,
+                               player.client.update(f'rooms/{self.code}', {
+                                   'stickChoice': self.rng.choice((bot_ai.LEFT, bot_ai.RIGHT)),
+                                   'roundPhase': 'voting',
+                                   'phaseStartedAt': TIMESTAMP,
+                                   'phaseDuration': VOTING_TIME,
+                                   'voteCount': 0,
+                                   'eligibleVoters': bot_ai.eligible_voter_ids(players, holder),
+                               }))
+        elif phase == 'voting':
+            votes = room.get('votes') or {}
+            if holder['id'] != player.id and player.id not in votes:
+                if not once('vote'):
+                    return
+                await self.pause()
+                updates = {f'votes/{player.id}': self.rng.choice((bot_ai.LEFT, bot_ai.RIGHT))}
+                if bot_ai.counts_vote(room, player.id):
+                    updates['voteCount'] = increment(1)
+                await player.write('vote', lambda r: player.id in (r.get('votes') or {}),
+                                   player.client.update(f'rooms/{self.code}', updates))
+            elif is_host and bot_ai.all_voted(room) and once('results'):
+                # closeWhenAllVoted: the counter says everyone is in
+                await self.show_results(player, current_round)
+        elif phase == 'results' and is_host and once('next'):
+            self.metrics.rounds += 1
+            await self.pause()
+            await self.next_round(player)
+
+    async def versioned_update(self, player, room, prepare):
+        """KaataqGame.versionedUpdate: a multi-path update prepared from the
+        player's copy of the room and stamped roomVersion + 1. Only when the
+        server refuses the stamp does prepare run again in a room
+        transaction, which reads the room first."""
+        updates = prepare(room)
+        if not updates:
+            return False
+        updates['roomVersion'] = (room.get('roomVersion') or 0) + 1
+        try:
+            await player.client.update(f'rooms/{self.code}', updates)
+            return True
+        except RoomClientError as error:
+            if error.status != 401:
+                raise
+
+        def update(room):
+            updates = prepare(room) if room else None
+            if not updates:
+                return None
+            apply_updates(room, updates)
+            room['roomVersion'] = (room.get('roomVersion') or 0) + 1
+            return room
+
+        self.metrics.version_conflicts += 1
+        self.metrics.reads += 1
+        committed, _ = await player.client.transaction(f'rooms/{self.code}', update)
+        return committed
+
+    async def host_action(self, host, action, predicate, prepare):
+        """KaataqGame.hostAction: validate against the room the host already
+        mirrors and send the changes as a versioned update."""
+        if not prepare(host.state):
+            return False
+        await host.write(action, predicate, self.versioned_update(host, host.state, prepare))
+        return True
+
+    async def start_game(self, host):
+        def prepare(room):
+            if room.get('gameStarted'):
+                return None
+            players = room.get('players') or {}
+            seats = [player_id for player_id in bot_ai.seats_of(room) if player_id in players]
+            seats += [player_id for player_id in players if player_id not in seats]
+            return {
+                'gameStarted': True,
+                'seats': seats,
+                'currentHolderIndex': 0,
+                'roundPhase': 'stick_choice',
+                'phaseStartedAt': TIMESTAMP,
+                'phaseDuration': DISCUSSION_TIME,
+            }
+
+        await self.host_action(host, 'startGame', lambda r: r.get('gameStarted') is True, prepare)
+
+    async def show_results(self, host, round_number):
+        # archiveColdHistory: copy rounds leaving the hot window first
+        history = bot_ai.history_list(host.state.get('gameHistory'))
+        keep_from = len(history) + 1 - HISTORY_HOT
+        archive = {str(index): entry for index, entry in enumerate(history)
+                   if entry and index < keep_from}
+        if archive:
+            self.metrics.writes += 1
+            await host.client.update(f'roomArchive/{self.code}/gameHistory', archive)
+
+        def resolve(room):
+            if not room or room.get('currentRound') != round_number:
+                return None
+            if (room.get('resolvedRound') or 0) >= room['currentRound']:
+                return None
+            updates = resolve_round(room)
+            updates.update({f'gameHistory/{index}': None for index in archive})
+            apply_updates(room, updates)
+            room['roomVersion'] = (room.get('roomVersion') or 0) + 1
+            return room
+
+        # Reference.transaction: a GET with an ETag and a conditional PUT
+        self.metrics.reads += 1
+        await host.write('showResults',
+                         lambda r: r.get('roundPhase') == 'results' and r.get('currentRound') == round_number,
+                         host.client.transaction(f'rooms/{self.code}', resolve))
+
+    async def next_round(self, host):
+        def prepare(room):
+            if room.get('roundPhase') != 'results':
+                return None
+            players = list((room.get('players') or {}).values())
+            if max(p.get('score') or 0 for p in players) >= bot_ai.WINNING_SCORE or \
+                    room['currentRound'] >= bot_ai.MAX_ROUNDS:
+                return {'gameEnded': True, 'roundPhase': 'finished'}
+            return {
+                'currentRound': room['currentRound'] + 1,
+                'currentHolderIndex': bot_ai.next_holder_index(room),
+                'roundPhase': 'stick_choice',
+                'stickChoice': None,
+                'votes': None,
+                'voteCount': None,
+                'eligibleVoters': None,
+                'phaseStartedAt': TIMESTAMP,
+                'phaseDuration': DISCUSSION_TIME,
+            }
+
+        current_round = host.state.get('currentRound')
+        await self.host_action(host, 'nextRound',
+                               lambda r: r.get('gameEnded') is True or r.get('currentRound') != current_round,
+                               prepare)
+
+    async def finish_game(self, host):
+        self.metrics.games += 1
+        self.games -= 1
+        if self.games <= 0:
+            self.done = True
+            return
+
+        # resetGame
+        def prepare(room):
+            updates = {f'players/{player_id}/score': 0 for player_id in room.get('players') or {}}
+            updates.update({
+                'gameStarted': False, 'gameEnded': False, 'currentRound': 1,
+                'currentHolderIndex': 0, 'roundPhase': 'waiting', 'stickChoice': None,
+                'phaseStartedAt': None, 'phaseDuration': None, 'resolvedRound': 0,
+                'votes': None, 'voteCount': None, 'eligibleVoters': None, 'gameHistory': None,
+            })
+            return updates
+
+        if await self.host_action(host, 'resetGame', lambda r: r.get('gameStarted') is False, prepare):
+            await host.client.remove(f'roomArchive/{self.code}')
+            self.metrics.writes += 1
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_server(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise SystemExit('❌ Room server did not start')
+            await asyncio.sleep(0.1)
+
+
+async def run_load(args):
+    server = None
+    url = args.url
+    if not url:
+        # A separate process, so the load generator doesn't slow the server down
+        port = free_port()
+        server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                'room_server.py'), '--port', str(port)],
+                                  stdout=subprocess.DEVNULL)
+        url = f'http://127.0.0.1:{port}/db'
+        await wait_for_server(port)
+
+    rng = random.Random(args.seed)
+    metrics = Metrics()
+    # Codes are claimed in the roomCodes index like createRoom does, and grow
+    # past 4 digits once those get crowded
+    allocator_client = RoomClient(url)
+    allocator = RoomCodeAllocator(allocator_client, rng=random.Random(rng.random()))
+    await allocator.load()
+    codes = [await allocator.allocate('load_test') for _ in range(args.rooms)]
+    await allocator_client.close()
+    rooms = [VirtualRoom(code, args.players, args.games, url, args.think, metrics,
+                         random.Random(rng.random())) for code in codes]
+
+    print(f"🏁 {args.rooms} rooms x {args.players} players, {args.games} game(s) each, against {url}")
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(asyncio.gather(*(room.run() for room in rooms)), args.timeout)
+    except asyncio.TimeoutError:
+        print(f"⚠️  Stopped after {args.timeout}s; reporting what finished")
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+    elapsed = time.perf_counter() - started
+    report(metrics, rooms, elapsed)
+
+
+def report(metrics, rooms, elapsed):
+    clients = [player.client for room in rooms for player in room.players]
+    rounds = max(metrics.rounds, 1)
+    print(f"\n⏱️  {metrics.games} games, {metrics.rounds} rounds in {elapsed:.1f}s "
+          f"({metrics.rounds / elapsed:.1f} rounds/s)")
+
+    print(f"\n  {'action':<14}{'samples':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    everything = []
+    for action, values in sorted(metrics.latencies.items()):
+        everything.extend(values)
+        print(f"  {action:<14}{len(values):>9}{percentile(values, 0.5) * 1000:>9.1f}"
+              f"{percentile(values, 0.95) * 1000:>9.1f}{percentile(values, 0.99) * 1000:>9.1f}")
+    print(f"  {'all':<14}{len(everything):>9}{percentile(everything, 0.5) * 1000:>9.1f}"
+          f"{percentile(everything, 0.95) * 1000:>9.1f}{percentile(everything, 0.99) * 1000:>9.1f}")
+
+    received = [client.bytes_received for client in clients]
+    sent = [client.bytes_sent for client in clients]
+    print(f"\n  writes per round:   {metrics.writes / rounds:.1f}")
+    print(f"  reads per round:    {metrics.reads / rounds:.1f}")
+    print(f"  version conflicts:  {metrics.version_conflicts} update(s) retried on a changed room")
+    print(f"  bytes per client:   {sum(received) / len(clients):,.0f} received "
+          f"(max {max(received):,}), {sum(sent) / len(clients):,.0f} sent")
+    print(f"  bytes per round:    {(sum(received) + sum(sent)) / rounds:,.0f} across all clients")
+    if metrics.errors:
+        print(f"  ❌ {metrics.errors} room(s) failed")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test the Kaataq room protocol.')
+    parser.add_argument('--url', help='database URL of a running room server (default: start one)')
+    parser.add_argument('--rooms', type=int, default=100, help='concurrent rooms (default: 100)')
+    parser.add_argument('--players', type=int, default=4, help='players per room (default: 4)')
+    parser.add_argument('--games', type=int, default=1, help='games per room (default: 1)')
+    parser.add_argument('--think', type=float, default=0.5,
+                        help='max seconds a player waits before each action (default: 0.5)')
+    parser.add_argument('--timeout', type=float, default=600, help='give up after this many seconds')
+    parser.add_argument('--seed', type=int, help='random seed for reproducible runs')
+    args = parser.parse_args(argv)
+    if args.players < 2:
+        parser.error('a room needs at least 2 players')
+    if args.rooms < 1:
+        parser.error('--rooms must be at least 1')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        asyncio.run(run_load(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+# Async client for the Kaataq room database
+#
+# Talks to room_server.py (or anything speaking the same subset of the
+# Realtime Database REST API) with nothing but asyncio: JSON reads and
+# writes, ETag transactions and event-stream subscriptions. Used by the
+# Python tools that play in rooms next to the browsers, like bot_worker.py.
+#
+#     client = RoomClient('http://127.0.0.1:8765/db')
+#     await client.update('rooms/1234', {'votes/bot_x': 'left'})
+#     async for event, path, data in client.listen('rooms'):
+#         ...
+import asyncio
+import json
+from urllib.parse import quote, urlencode, urlsplit
+
+from room_server import etag, split_path
+
+TIMESTAMP = {'.sv': 'timestamp'}
+MAX_TRANSACTION_ATTEMPTS = 25  # same limit as firebase-local.js
+RECONNECT_SECONDS = 1
+UNKNOWN = object()  # transaction() has no local copy of the value
+STREAM_LINE_LIMIT = 64 * 1024 * 1024  # one event carries a whole subtree on one line
+
+
+def increment(delta):
+    """Server-side add to a number, like ServerValue.increment."""
+    return {'.sv': {'increment': delta}}
+
+
+class RoomClientError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f'{message} ({status})')
+        self.status = status
+
+
+class RoomClient:
+    """REST and event-stream access to one database URL.
+
+    Requests reuse idle keep-alive connections, so a busy client costs a
+    handful of sockets rather than one per write.
+    """
+
+    def __init__(self, base_url, pool_size=8):
+        url = urlsplit(base_url)
+        if url.scheme != 'http':
+            raise ValueError('Only http:// database URLs are supported')
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.prefix = url.path.rstrip('/')
+        self.pool_size = pool_size
+        self.idle = []
+        self.requests = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def target(self, path, query=None):
+        parts = split_path(path) if isinstance(path, str) else path
+        target = f"{self.prefix}/{'/'.join(quote(part, safe='') for part in parts)}.json"
+        if query:
+            # Query values are JSON in the URL: orderBy="createdAt", limitToFirst=10
+            target += '?' + urlencode({name: json.dumps(value) for name, value in query.items()})
+        return target
+
+    async def close(self):
+        while self.idle:
+            _, writer = self.idle.pop()
+            writer.close()
+
+    # Plain requests
+
+    async def request(self, method, path, body=None, headers=None, query=None):
+        """Send one request; returns (status, response headers, JSON data)."""
+        payload = b'' if body is None else json.dumps(body, separators=(',', ':')).encode('utf-8')
+        lines = [f'{method} {self.target(path, query)} HTTP/1.1',
+                 f'Host: {self.host}:{self.port}',
+                 f'Content-Length: {len(payload)}']
+        if payload:
+            lines.append('Content-Type: application/json')
+        for name, value in (headers or {}).items():
+            lines.append(f'{name}: {value}')
+        message = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + payload
+
+        pooled = bool(self.idle)
+        reader, writer = self.idle.pop() if pooled else await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(message)
+            await writer.drain()
+            status, response_headers, data = await self._read_response(reader)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+            if not pooled:
+                raise
+            # The server closed the idle connection meanwhile; retry on a fresh one
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            writer.write(message)
+            await writer.drain()
+            status, response_headers, data = await self._read_response(reader)
+
+        self.requests += 1
+        self.bytes_sent += len(message)
+        if response_headers.get('connection', '').lower() == 'close' or len(self.idle) >= self.pool_size:
+            writer.close()
+        else:
+            self.idle.append((reader, writer))
+        return status, response_headers, data
+
+    async def _read_response(self, reader):
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError('Connection closed')
+        received = len(line)
+        status = int(line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            received += len(line)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length') or 0)
+        body = await reader.readexactly(length) if length else b''
+        self.bytes_received += received + length
+        return status, headers, json.loads(body) if body else None
+
+    async def _checked(self, method, path, body=None, query=None):
+        status, _, data = await self.request(method, path, body, query=query)
+        if status >= 400:
+            raise RoomClientError(status, (data or {}).get('error', 'Request failed')
+                                  if isinstance(data, dict) else 'Request failed')
+        return data
+
+    async def get(self, path, **query):
+        """Read a value; keyword arguments are REST query parameters, e.g.
+        get('rooms', orderBy='createdAt', endAt=cutoff) or shallow=True."""
+        return await self._checked('GET', path, query=query)
+
+    async def set(self, path, value):
+        return await self._checked('PUT', path, value)
+
+    async def update(self, path, values):
+        """Multi-path update: keys may contain '/'."""
+        return await self._checked('PATCH', path, values)
+
+    async def remove(self, path):
+        return await self._checked('DELETE', path)
+
+    async def transaction(self, path, update_function, cached=UNKNOWN):
+        """Optimistic read-modify-write with if-match, like Reference.transaction.
+
+        update_function gets the current value and returns the new one, or
+        None to abort. Returns (committed, value). With the value a listener
+        already holds as cached, the first attempt skips the read, as the SDK
+        does; an abort decided on it is checked against the server.
+        """
+        if cached is UNKNOWN:
+            status, headers, current = await self.request('GET', path, headers={'X-Firebase-ETag': 'true'})
+        else:
+            headers, current = {'etag': etag(cached)}, cached
+        for _ in range(MAX_TRANSACTION_ATTEMPTS):
+            value = update_function(current)
+            if value is None:
+                if cached is not UNKNOWN:
+                    cached = UNKNOWN
+                    status, headers, current = await self.request('GET', path,
+                                                                  headers={'X-Firebase-ETag': 'true'})
+                    continue
+                return False, current
+            status, headers, data = await self.request('PUT', path, value,
+                                                       headers={'if-match': headers.get('etag', '')})
+            if status != 412:
+                if status >= 400:
+                    raise RoomClientError(status, 'Transaction write failed')
+                return True, data
+            current = data  # 412 carries the current value and ETag
+        raise RoomClientError(412, 'maxretry')
+
+    # Event streams
+
+    async def listen(self, path):
+        """Yield (event, path parts, data) for 'put' and 'patch' events at
+        path, reconnecting if the stream drops. Every (re)connection starts
+        with a 'put' of the whole value, so a mirror resyncs by itself."""
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port,
+                                                               limit=STREAM_LINE_LIMIT)
+            except OSError:
+                await asyncio.sleep(RECONNECT_SECONDS)
+                continue
+            try:
+                writer.write((f'GET {self.target(path)} HTTP/1.1\r\n'
+                              f'Host: {self.host}:{self.port}\r\n'
+                              'Accept: text/event-stream\r\n\r\n').encode('latin-1'))
+                await writer.drain()
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass  # response headers
+                event = None
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    line = line.decode('utf-8').rstrip('\r\n')
+                    self.bytes_received += len(line) + 1
+                    if line.startswith('event:'):
+                        event = line[len('event:'):].strip()
+                    elif line.startswith('data:') and event in ('put', 'patch'):
+                        message = json.loads(line[len('data:'):])
+                        yield event, split_path(message['path']), message['data']
+                    elif not line:
+                        event = None
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            finally:
+                writer.close()
+            await asyncio.sleep(RECONNECT_SECONDS)
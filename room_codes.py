@@ -0,0 +1,130 @@
+# Room code allocator for Kaataq
+#
+# Hands out room codes that no live room is using. Every live code has an
+# entry in the roomCodes/ index, written with a conditional PUT that only
+# succeeds while the entry is empty - the same claim the browser makes with
+# a transaction in KaataqGame.allocateRoomCode - so two creators can never
+# end up in one room. Codes come from a pre-shuffled free list per length,
+# so allocating is O(1) and never retries a code this process knows is
+# taken; once a length is mostly used up, new codes grow by a digit.
+#
+#     allocator = RoomCodeAllocator(RoomClient('http://127.0.0.1:8765/db'))
+#     await allocator.load()
+#     code = await allocator.allocate('player_abc')
+#     ...
+#     await allocator.release(code)
+import random
+from collections import deque
+
+from room_client import TIMESTAMP, RoomClientError
+
+MIN_LENGTH = 4  # game.js config.roomCodeLength
+MAX_LENGTH = 8  # longest code the join input accepts
+MAX_OCCUPANCY = 0.5  # move to longer codes once half of a length is live
+SHUFFLED_MAX_LENGTH = 5  # longer code spaces are too big to list; probe them at random
+MAX_PROBES = 32
+
+
+class RoomCodesExhausted(Exception):
+    pass
+
+
+def code_space(length):
+    """Number of codes of a length; codes never start with a 0."""
+    return 9 * 10 ** (length - 1)
+
+
+class RoomCodeAllocator:
+    def __init__(self, client, min_length=MIN_LENGTH, max_length=MAX_LENGTH,
+                 max_occupancy=MAX_OCCUPANCY, rng=None):
+        self.client = client
+        self.min_length = min_length
+        self.max_length = max_length
+        self.max_occupancy = max_occupancy
+        self.rng = rng or random.Random()
+        self.free = {}  # length -> shuffled codes, drawn from the end
+        self.live = set()  # codes known to be in the index
+        self.live_by_length = {}
+        self.claims = 0
+        self.collisions = 0
+
+    async def load(self):
+        """Learn the codes already in the index, e.g. after a restart."""
+        index = await self.client.get('roomCodes') or {}
+        # Numeric keys make the database return a list once it is dense enough
+        codes = index if isinstance(index, dict) else [str(code) for code, entry in enumerate(index) if entry]
+        for code in codes:
+            self._mark_live(code)
+
+    def length(self):
+        """Shortest code length still below the occupancy limit."""
+        for length in range(self.min_length, self.max_length + 1):
+            if self.live_by_length.get(length, 0) < code_space(length) * self.max_occupancy:
+                return length
+        raise RoomCodesExhausted('Every room code length is full')
+
+    def _mark_live(self, code):
+        if code not in self.live:
+            self.live.add(code)
+            self.live_by_length[len(code)] = self.live_by_length.get(len(code), 0) + 1
+
+    def _mark_free(self, code):
+        if code in self.live:
+            self.live.discard(code)
+            self.live_by_length[len(code)] -= 1
+
+    def _draw(self, length):
+        if length > SHUFFLED_MAX_LENGTH:
+            low = 10 ** (length - 1)
+            for _ in range(MAX_PROBES):
+                code = str(self.rng.randrange(low, low * 10))
+                if code not in self.live:
+                    return code
+            return None
+        if length not in self.free:
+            low = 10 ** (length - 1)
+            codes = [str(code) for code in range(low, low * 10)]
+            self.rng.shuffle(codes)
+            self.free[length] = deque(codes)
+        codes = self.free[length]
+        # Live codes are dropped lazily as they come up
+        while codes:
+            code = codes.pop()
+            if code not in self.live:
+                return code
+        return None
+
+    async def allocate(self, owner):
+        """Claim a free code for owner's new room and return it."""
+        while True:
+            length = self.length()
+            code = self._draw(length)
+            if code is None:
+                # Everything this process can see is taken; treat the length as full
+                self.live_by_length[length] = code_space(length)
+                continue
+            # Claim only while the entry is empty (null ETag), so concurrent
+            # allocators and browsers can't both get the code
+            self._mark_live(code)
+            status, _, _ = await self.client.request(
+                'PUT', f'roomCodes/{code}', {'owner': owner, 'claimedAt': TIMESTAMP},
+                headers={'if-match': 'null_etag'})
+            self.claims += 1
+            if status == 412:
+                self.collisions += 1
+                continue
+            if status >= 400:
+                self._mark_free(code)
+                raise RoomClientError(status, 'Room code claim failed')
+            return code
+
+    async def release(self, code):
+        """Delete a room with its archive and index entry in one write, and
+        put the code back in the free list."""
+        await self.client.update('', {f'rooms/{code}': None,
+                                      f'roomArchive/{code}': None,
+                                      f'roomCodes/{code}': None})
+        self._mark_free(code)
+        if len(code) in self.free:
+            # Reused last, so a late joiner with the old code doesn't land in a new room
+            self.free[len(code)].appendleft(code)
@@ -0,0 +1,257 @@
+# Kaataq room garbage collector
+#
+# Deletes rooms nobody plays in any more, players who disconnected and never
+# came back, and room codes or archived rounds whose room is gone. Meant to
+# run from cron against the room server, or offline against a JSON export of
+# the database:
+#
+#     python room_gc.py --url http://127.0.0.1:8765/db
+#     python room_gc.py --dump export.json --output cleaned.json
+#
+# Presence comes from the markers KaataqGame.startPresence leaves: each
+# heartbeat() refreshes lastSeenAt and re-registers an onDisconnect write of
+# connected: false plus lastSeenAt. Only rooms created before the cutoff are
+# read, with an orderBy="createdAt" query; on the hosted database that needs
+# ".indexOn": ["createdAt"] on rooms. Deletes go out as multi-path updates of
+# --batch paths each.
+import argparse
+import asyncio
+import json
+import time
+
+from room_client import RoomClient, RoomClientError, increment
+from room_server import Database, now_ms, query_children, shallow, split_path
+
+IDLE_MINUTES = 60
+MAX_AGE_HOURS = 24
+PLAYER_GRACE_MINUTES = 10
+CLAIM_GRACE_MS = 5 * 60 * 1000  # a code this fresh may belong to a room being created
+BATCH_SIZE = 500
+
+
+def children(value):
+    """A node's children as a dict; numeric keys come back as a list."""
+    if isinstance(value, list):
+        return {str(index): child for index, child in enumerate(value) if child is not None}
+    return value if isinstance(value, dict) else {}
+
+
+class RemoteStore:
+    """The live database, through the REST API."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def rooms_created_before(self, cutoff):
+        return children(await self.client.get('rooms', orderBy='createdAt', endAt=cutoff))
+
+    async def get(self, path):
+        return await self.client.get(path)
+
+    async def keys(self, path):
+        return set(children(await self.client.get(path, shallow=True)))
+
+    async def update(self, values):
+        await self.client.update('', values)
+
+
+class DumpStore:
+    """A JSON export, loaded into an in-memory Database."""
+
+    def __init__(self, data):
+        self.database = Database(data)
+
+    async def rooms_created_before(self, cutoff):
+        return children(query_children(self.database.get(['rooms']),
+                                       {'orderBy': '"createdAt"', 'endAt': json.dumps(cutoff)}))
+
+    async def get(self, path):
+        return self.database.get(split_path(path))
+
+    async def keys(self, path):
+        return set(children(shallow(self.database.get(split_path(path)))))
+
+    async def update(self, values):
+        self.database.update([], values)
+
+
+class Metrics:
+    def __init__(self):
+        self.rooms_scanned = 0
+        self.rooms_deleted = {'idle': 0, 'expired': 0, 'empty': 0}
+        self.players_removed = 0
+        self.codes_freed = 0
+        self.archives_freed = 0
+        self.bytes_freed = 0
+        self.writes = 0
+
+
+def seat_order(room, player_id):
+    seats = list(children(room.get('seats')).values())
+    return seats.index(player_id) if player_id in seats else len(seats)
+
+
+class RoomCollector:
+    def __init__(self, store, idle_minutes=IDLE_MINUTES, max_age_hours=MAX_AGE_HOURS,
+                 player_grace_minutes=PLAYER_GRACE_MINUTES, batch_size=BATCH_SIZE, dry_run=False):
+        self.store = store
+        self.idle_ms = idle_minutes * 60 * 1000
+        self.max_age_ms = max_age_hours * 3600 * 1000
+        self.player_grace_ms = player_grace_minutes * 60 * 1000
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.metrics = Metrics()
+        self.deletes = {}  # path -> new value (None deletes), written in batches
+
+    async def run(self, now=None):
+        now = now if now is not None else now_ms()
+        # A younger room can't be idle, and can't hold a player gone for longer than the grace
+        rooms = await self.store.rooms_created_before(now - min(self.idle_ms, self.player_grace_ms))
+        deleted = set()
+        for code, room in rooms.items():
+            self.metrics.rooms_scanned += 1
+            if self.collect_room(code, room, now):
+                deleted.add(code)
+        await self.collect_orphans(deleted, now)
+        await self.flush()
+        return self.metrics
+
+    def delete_room(self, code, room, reason):
+        self.metrics.rooms_deleted[reason] += 1
+        self.metrics.bytes_freed += len(json.dumps(room, separators=(',', ':')))
+        self.deletes[f'rooms/{code}'] = None
+        self.deletes[f'roomArchive/{code}'] = None
+        self.deletes[f'roomCodes/{code}'] = None
+
+    def collect_room(self, code, room, now):
+        """Queue the deletes for one room; True if the whole room goes."""
+        players = room.get('players') or {}
+        humans = {player_id: player for player_id, player in players.items() if not player.get('isBot')}
+        if now - (room.get('createdAt') or 0) >= self.max_age_ms:
+            self.delete_room(code, room, 'expired')
+            return True
+
+        last_active = max([room.get('createdAt') or 0, room.get('phaseStartedAt') or 0] +
+                          [player.get('lastSeenAt') or 0 for player in humans.values()])
+        connected = [player_id for player_id, player in humans.items() if player.get('connected') is True]
+        if not connected and now - last_active >= self.idle_ms:
+            self.delete_room(code, room, 'idle')
+            return True
+
+        gone = [player_id for player_id, player in humans.items()
+                if player.get('connected') is False
+                and now - (player.get('lastSeenAt') or 0) >= self.player_grace_ms]
+        if not gone:
+            return False
+        if len(gone) == len(humans):
+            self.delete_room(code, room, 'empty')
+            return True
+
+        # Seats outlive their players, so removing one mid-game leaves the
+        # holder order alone; the turn skips the empty seat
+        for player_id in gone:
+            self.metrics.players_removed += 1
+            self.metrics.bytes_freed += len(json.dumps(humans[player_id], separators=(',', ':')))
+            self.deletes[f'rooms/{code}/players/{player_id}'] = None
+        # Hosts validate against their cached room; the version tells them it moved
+        self.deletes[f'rooms/{code}/roomVersion'] = increment(1)
+        if room.get('host') in gone:
+            # Hand the room to the first seated human left, as heirOf in
+            # game.js does: connected players first
+            heir = min((player_id for player_id in humans if player_id not in gone),
+                       key=lambda player_id: (humans[player_id].get('connected') is False,
+                                              seat_order(room, player_id)))
+            self.deletes[f'rooms/{code}/host'] = heir
+            self.deletes[f'rooms/{code}/players/{heir}/isHost'] = True
+        return False
+
+    async def collect_orphans(self, deleted, now):
+        """Codes and archives whose room no longer exists."""
+        live = await self.store.keys('rooms') - deleted
+        for code, entry in children(await self.store.get('roomCodes')).items():
+            claimed_at = (entry.get('claimedAt') or 0) if isinstance(entry, dict) else 0
+            if code not in live and code not in deleted and now - claimed_at >= CLAIM_GRACE_MS:
+                self.metrics.codes_freed += 1
+                self.deletes[f'roomCodes/{code}'] = None
+        for code in await self.store.keys('roomArchive'):
+            if code not in live and code not in deleted:
+                self.metrics.archives_freed += 1
+                self.deletes[f'roomArchive/{code}'] = None
+
+    async def flush(self):
+        paths = list(self.deletes.items())
+        self.deletes = {}
+        if self.dry_run:
+            return
+        for start in range(0, len(paths), self.batch_size):
+            await self.store.update(dict(paths[start:start + self.batch_size]))
+            self.metrics.writes += 1
+
+
+def report(metrics, elapsed, dry_run):
+    rooms = sum(metrics.rooms_deleted.values())
+    reasons = ', '.join(f'{count} {reason}' for reason, count in metrics.rooms_deleted.items())
+    verb = 'would delete' if dry_run else 'deleted'
+    print(f"  rooms scanned:     {metrics.rooms_scanned}")
+    print(f"  {'rooms ' + verb + ':':<19}{rooms} ({reasons})")
+    print(f"  players removed:   {metrics.players_removed}")
+    print(f"  room codes freed:  {metrics.codes_freed} orphaned")
+    print(f"  archives freed:    {metrics.archives_freed} orphaned")
+    print(f"  bytes reclaimed:   {metrics.bytes_freed:,}")
+    print(f"\n⏱️  {metrics.writes} write(s) in {elapsed:.2f}s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Delete stale Kaataq rooms and abandoned players.')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--url', help='database URL of a running room server')
+    source.add_argument('--dump', metavar='FILE', help='JSON export of the database to clean')
+    parser.add_argument('--output', metavar='FILE',
+                        help='where to write the cleaned export (default: rewrite --dump)')
+    parser.add_argument('--idle-minutes', type=float, default=IDLE_MINUTES,
+                        help='delete rooms with nobody connected and no activity for this long '
+                             '(default: %(default)s)')
+    parser.add_argument('--max-age-hours', type=float, default=MAX_AGE_HOURS,
+                        help='delete every room older than this (default: %(default)s)')
+    parser.add_argument('--player-grace-minutes', type=float, default=PLAYER_GRACE_MINUTES,
+                        help='remove players disconnected for this long (default: %(default)s)')
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE,
+                        help='paths per multi-path delete (default: %(default)s)')
+    parser.add_argument('--dry-run', action='store_true', help='report without deleting anything')
+    return parser.parse_args(argv)
+
+
+async def collect(args):
+    if args.url:
+        client = RoomClient(args.url)
+        store = RemoteStore(client)
+    else:
+        with open(args.dump, 'r', encoding='utf-8') as f:
+            store = DumpStore(json.load(f))
+    collector = RoomCollector(store, args.idle_minutes, args.max_age_hours,
+                              args.player_grace_minutes, args.batch, args.dry_run)
+    try:
+        metrics = await collector.run()
+    finally:
+        if args.url:
+            await client.close()
+    if args.dump and not args.dry_run:
+        with open(args.output or args.dump, 'w', encoding='utf-8') as f:
+            # Exported, so arrays (seats, gameHistory) keep the shape they were read in
+            json.dump(store.database.get([]) or {}, f, separators=(',', ':'))
+    return metrics
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"🧹 Collecting stale rooms in {args.url or args.dump}" + (' (dry run)' if args.dry_run else ''))
+    started = time.perf_counter()
+    try:
+        metrics = asyncio.run(collect(args))
+    except (OSError, RoomClientError) as error:
+        raise SystemExit(f"❌ {error}")
+    report(metrics, time.perf_counter() - started, args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
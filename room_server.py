@@ -0,0 +1,707 @@
+# Local room server for Kaataq
+#
+# A self-hosted stand-in for the Firebase Realtime Database. It speaks the
+# subset of the database REST API the game needs (GET/PUT/PATCH/DELETE on
+# "<path>.json" plus text/event-stream subscriptions) and keeps all data in
+# memory, so rooms can be run and load-tested without the hosted service.
+# firebase-local.js is the matching browser shim.
+#
+#     python room_server.py --port 8765 --static dist
+#
+# The database lives under /db/ (e.g. GET /db/rooms/1234.json); with --static
+# every other path is served from the given directory. Reads take the REST
+# API's orderBy/startAt/endAt/equalTo/limitToFirst/limitToLast and shallow
+# parameters. One extension stands in for the SDK's onDisconnect(): event
+# streams opened with ?session=<id> belong to a client session, and writes
+# sent as POST <path>.json?session=<id>&onDisconnect=set|update|remove|cancel
+# run once all of that session's streams have been closed for a few seconds.
+# Writes are held to the one rule the game relies on, the roomVersion guard
+# (see version_guard).
+import argparse
+import asyncio
+import hashlib
+import json
+import mimetypes
+import os
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+
+DB_PREFIX = '/db'
+KEEPALIVE_SECONDS = 30
+SUBSCRIBER_QUEUE_SIZE = 1000
+DISCONNECT_GRACE_SECONDS = 5  # a stream reconnecting within this isn't a disconnect
+
+STATUS_TEXT = {
+    200: 'OK',
+    204: 'No Content',
+    400: 'Bad Request',
+    401: 'Unauthorized',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    412: 'Precondition Failed',
+    500: 'Internal Server Error',
+}
+
+
+def split_path(path):
+    """'/rooms/1234/' -> ['rooms', '1234']"""
+    return [part for part in path.split('/') if part]
+
+
+def is_prefix(prefix, parts):
+    return len(prefix) <= len(parts) and parts[:len(prefix)] == prefix
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def etag(value):
+    """ETag for a value, as used by transactions (if-match on writes)."""
+    if value is None:
+        return 'null_etag'
+    canonical = json.dumps(value, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def resolve_server_values(value, timestamp, current=None):
+    """Replace server value placeholders: {'.sv': 'timestamp'} with the
+    server clock, and {'.sv': {'increment': n}} with the stored value
+    (current, in stored form) plus n."""
+    if isinstance(value, dict):
+        server_value = value.get('.sv')
+        if server_value == 'timestamp':
+            return timestamp
+        if isinstance(server_value, dict) and 'increment' in server_value:
+            base = current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0
+            return base + server_value['increment']
+        current = current if isinstance(current, dict) else {}
+        return {key: resolve_server_values(child, timestamp, current.get(str(key)))
+                for key, child in value.items()}
+    if isinstance(value, list):
+        current = current if isinstance(current, dict) else {}
+        return [resolve_server_values(child, timestamp, current.get(str(index)))
+                for index, child in enumerate(value)]
+    return value
+
+
+def normalize(value):
+    """Convert a JSON value to the stored form.
+
+    Like the hosted database, arrays are stored as objects keyed by index,
+    and null or empty children simply don't exist. Returns None for a value
+    that stores nothing.
+    """
+    if isinstance(value, list):
+        value = {str(index): child for index, child in enumerate(value)}
+    if isinstance(value, dict):
+        stored = {}
+        for key, child in value.items():
+            child = normalize(child)
+            if child is not None:
+                stored[str(key)] = child
+        return stored or None
+    return value
+
+
+def export(value):
+    """Copy a stored value out, turning dense integer-keyed objects back into
+    arrays the way the hosted database does."""
+    if not isinstance(value, dict):
+        return value
+    if value and all(key.isdigit() for key in value):
+        indices = [int(key) for key in value]
+        if max(indices) < 2 * len(indices):
+            items = [None] * (max(indices) + 1)
+            for key, child in value.items():
+                items[int(key)] = export(child)
+            return items
+    return {key: export(child) for key, child in value.items()}
+
+
+def order_key(value):
+    """Sort key in the database's query order: null, false, true, numbers,
+    strings, then objects."""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1 + value, 0)
+    if isinstance(value, (int, float)):
+        return (3, value)
+    if isinstance(value, str):
+        return (4, value)
+    return (5, 0)
+
+
+def query_children(value, params):
+    """Filter a node's children with the REST query parameters.
+
+    params maps parameter names to their JSON-encoded values, as they appear
+    in the URL: orderBy ("$key", "$value" or a child path), startAt, endAt,
+    equalTo, limitToFirst and limitToLast. Raises ValueError for a bad query.
+    """
+    if isinstance(value, list):
+        value = {str(index): child for index, child in enumerate(value) if child is not None}
+    if not isinstance(value, dict):
+        return None
+    params = {name: json.loads(raw) for name, raw in params.items()}
+    order_by = params.get('orderBy')
+    if not isinstance(order_by, str):
+        raise ValueError('orderBy must be a JSON string')
+
+    def ordered_value(key, child):
+        if order_by == '$key':
+            return key
+        if order_by == '$value':
+            return child
+        for part in split_path(order_by):
+            child = child.get(part) if isinstance(child, dict) else None
+        return child
+
+    items = sorted(((order_key(ordered_value(key, child)), key, child) for key, child in value.items()),
+                   key=lambda item: (item[0], item[1]))
+    if 'equalTo' in params:
+        params['startAt'] = params['endAt'] = params['equalTo']
+    if 'startAt' in params:
+        items = [item for item in items if item[0] >= order_key(params['startAt'])]
+    if 'endAt' in params:
+        items = [item for item in items if item[0] <= order_key(params['endAt'])]
+    if 'limitToFirst' in params:
+        items = items[:int(params['limitToFirst'])]
+    if 'limitToLast' in params:
+        items = items[len(items) - int(params['limitToLast']):] if params['limitToLast'] else []
+    return {key: child for _, key, child in items}
+
+
+def shallow(value):
+    """?shallow=true: children of an object become true, leaves stay."""
+    if isinstance(value, list):
+        return {str(index): True for index, child in enumerate(value) if child is not None}
+    if isinstance(value, dict):
+        return {key: True for key in value}
+    return value
+
+
+# The roomVersion guard, the counterpart of this rule on the hosted database:
+#
+#     "rooms": {"$room": {"roomVersion": {
+#         ".validate": "!data.exists() || newData.val() === data.val() + 1"}}}
+#
+# A room's version may be created or deleted, but only ever moves up by one.
+# Joins, leaves and room transactions all bump it by one from the stored
+# value; a host action sends its prepared multi-path update with the version
+# it was prepared from plus one, so an update built from a stale room is
+# refused whole instead of overwriting what landed meanwhile (see
+# KaataqGame.hostAction).
+VERSION_PATH = ('rooms', None, 'roomVersion')  # None matches any room code
+
+
+def versions_written(parts, value):
+    """Yield (parts, new value) for every roomVersion a write of value at
+    parts sets; keys absent from the value are deletes and don't count."""
+    if len(parts) > len(VERSION_PATH) or \
+            any(want is not None and want != part for want, part in zip(VERSION_PATH, parts)):
+        return
+    if len(parts) == len(VERSION_PATH):
+        yield parts, value
+    elif isinstance(value, dict):
+        for key, child in value.items():
+            yield from versions_written(parts + split_path(str(key)), child)
+
+
+def version_guard(database, writes):
+    """True if every (parts, value) write keeps the roomVersion rule."""
+    for parts, value in writes:
+        for version_parts, raw in versions_written(parts, value):
+            current = database.get(version_parts)
+            new = resolve_server_values(raw, now_ms(), current)
+            if not isinstance(current, (int, float)) or new is None:
+                continue
+            if new != current + 1:
+                return False
+    return True
+
+
+class Subscriber:
+    """One event-stream client listening at a path."""
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.closed = False
+
+    def send(self, event, path, data):
+        if self.closed:
+            return
+        payload = json.dumps({'path': '/' + '/'.join(path), 'data': data}, separators=(',', ':'))
+        try:
+            self.queue.put_nowait(f'event: {event}\ndata: {payload}\n\n')
+        except asyncio.QueueFull:
+            # A client this far behind will resync from a fresh 'put' when
+            # its EventSource reconnects; dropping it keeps memory bounded.
+            self.closed = True
+
+
+class SubscriptionTree:
+    """Subscribers indexed by path, so a write only visits the subscribers
+    above or below it instead of every open stream on the server."""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.children = {}
+
+    def add(self, subscriber):
+        node = self
+        for part in subscriber.parts:
+            node = node.children.setdefault(part, SubscriptionTree())
+        node.subscribers.add(subscriber)
+
+    def discard(self, subscriber):
+        node, trail = self, []
+        for part in subscriber.parts:
+            if part not in node.children:
+                return
+            trail.append((node, part))
+            node = node.children[part]
+        node.subscribers.discard(subscriber)
+        while trail and not node.subscribers and not node.children:
+            parent, part = trail.pop()
+            del parent.children[part]
+            node = parent
+
+    def affected(self, parts):
+        """Return (above, below): subscribers at or above parts, and
+        subscribers strictly below it."""
+        above = list(self.subscribers)
+        node = self
+        for part in parts:
+            node = node.children.get(part)
+            if node is None:
+                return above, []
+            above.extend(node.subscribers)
+        below = []
+        stack = list(node.children.values())
+        while stack:
+            child = stack.pop()
+            below.extend(child.subscribers)
+            stack.extend(child.children.values())
+        return above, below
+
+    def __len__(self):
+        return len(self.subscribers) + sum(len(child) for child in self.children.values())
+
+
+class Database:
+    """In-memory JSON tree with path subscriptions.
+
+    All mutations run on the event loop thread, so every write is atomic and
+    subscribers see them in one global order.
+    """
+
+    def __init__(self, data=None):
+        self.root = normalize(data) or {}
+        self.subscribers = SubscriptionTree()
+        self.writes = 0
+
+    # Reads
+
+    def _node(self, parts):
+        """The stored node at parts, without copying."""
+        node = self.root
+        for part in parts:
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+    def get(self, parts):
+        return export(self._node(parts))
+
+    # Writes
+
+    def _store(self, parts, value):
+        if not parts:
+            self.root = value if isinstance(value, dict) else {}
+            return
+        node = self.root
+        trail = []
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                if value is None:
+                    return
+                child = node[part] = {}
+            trail.append((node, part))
+            node = child
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = value
+        # Prune parents left empty by a delete
+        while trail and not node:
+            parent, key = trail.pop()
+            del parent[key]
+            node = parent
+
+    def set(self, parts, value):
+        value = normalize(resolve_server_values(value, now_ms(), self._node(parts)))
+        self._store(parts, value)
+        self.writes += 1
+        self._notify_put(parts)
+        return export(value)
+
+    def update(self, parts, values):
+        """Multi-path update: keys may themselves contain '/'."""
+        timestamp = now_ms()
+        changes = []
+        for key, value in values.items():
+            child_parts = parts + split_path(key)
+            value = normalize(resolve_server_values(value, timestamp, self._node(child_parts)))
+            self._store(child_parts, value)
+            changes.append((split_path(key), export(value)))
+        self.writes += 1
+        self._notify_patch(parts, changes)
+        return {'/'.join(key): value for key, value in changes}
+
+    def remove(self, parts):
+        return self.set(parts, None)
+
+    # Subscriptions
+
+    def subscribe(self, parts):
+        subscriber = Subscriber(parts)
+        self.subscribers.add(subscriber)
+        subscriber.send('put', [], self.get(parts))
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscriber.closed = True
+        self.subscribers.discard(subscriber)
+
+    def _notify_put(self, parts):
+        above, below = self.subscribers.affected(parts)
+        if above:
+            value = self.get(parts)
+            for subscriber in above:
+                subscriber.send('put', parts[len(subscriber.parts):], value)
+        for subscriber in below:
+            subscriber.send('put', [], self.get(subscriber.parts))
+
+    def _notify_patch(self, parts, changes):
+        above, below = self.subscribers.affected(parts)
+        data = {'/'.join(key): value for key, value in changes}
+        for subscriber in above:
+            subscriber.send('patch', parts[len(subscriber.parts):], data)
+        for subscriber in below:
+            rel = subscriber.parts[len(parts):]
+            if any(is_prefix(key, rel) or is_prefix(rel, key) for key, _ in changes):
+                subscriber.send('put', [], self.get(subscriber.parts))
+
+
+class Session:
+    """A client's open event streams and the writes to run once they are all
+    gone (the SDK's onDisconnect)."""
+
+    def __init__(self):
+        self.streams = 0
+        self.operations = []  # (operation, path parts, value)
+        self.timer = None
+
+
+class RoomServer:
+    """HTTP front end: database REST API under /db, static files elsewhere."""
+
+    def __init__(self, database=None, static_dir=None):
+        self.database = database if database is not None else Database()
+        self.static_dir = os.path.abspath(static_dir) if static_dir else None
+        self.sessions = {}
+
+    async def start(self, host='127.0.0.1', port=8765):
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request = await self.read_request(reader)
+                if request is None:
+                    break
+                keep_alive = await self.dispatch(request, reader, writer)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode('latin-1').split()
+        except ValueError:
+            return None
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length') or 0)
+        body = await reader.readexactly(length) if length else b''
+        return {'method': method.upper(), 'target': target, 'version': version,
+                'headers': headers, 'body': body}
+
+    async def respond(self, writer, status, body=b'', content_type='application/json',
+                      headers=None, keep_alive=True):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        lines = [f'HTTP/1.1 {status} {STATUS_TEXT.get(status, "")}',
+                 f'Content-Type: {content_type}',
+                 f'Content-Length: {len(body)}',
+                 'Access-Control-Allow-Origin: *',
+                 'Access-Control-Allow-Headers: Content-Type, If-Match, X-Firebase-ETag',
+                 'Access-Control-Expose-Headers: ETag',
+                 'Access-Control-Allow-Methods: GET, PUT, PATCH, POST, DELETE, OPTIONS',
+                 'Connection: ' + ('keep-alive' if keep_alive else 'close')]
+        for name, value in (headers or {}).items():
+            lines.append(f'{name}: {value}')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+        return keep_alive
+
+    async def dispatch(self, request, reader, writer):
+        url = urlsplit(request['target'])
+        path = unquote(url.path)
+        keep_alive = request['headers'].get('connection', '').lower() != 'close'
+
+        if request['method'] == 'OPTIONS':
+            return await self.respond(writer, 204, keep_alive=keep_alive)
+        if path == DB_PREFIX or path.startswith(DB_PREFIX + '/'):
+            return await self.handle_database(request, path[len(DB_PREFIX):], parse_qs(url.query),
+                                              reader, writer, keep_alive)
+        if self.static_dir and request['method'] in ('GET', 'HEAD'):
+            return await self.handle_static(request, path, writer, keep_alive)
+        return await self.respond(writer, 404, json.dumps({'error': 'Not found'}),
+                                  keep_alive=keep_alive)
+
+    async def handle_database(self, request, path, query, reader, writer, keep_alive):
+        if not path.endswith('.json'):
+            return await self.respond(writer, 400, json.dumps({'error': 'Paths must end in .json'}),
+                                      keep_alive=keep_alive)
+        parts = split_path(path[:-len('.json')])
+        method = request['method']
+
+        try:
+            body = json.loads(request['body']) if request['body'] else None
+        except ValueError:
+            return await self.respond(writer, 400, json.dumps({'error': 'Invalid JSON'}),
+                                      keep_alive=keep_alive)
+
+        session = query.get('session', [None])[0]
+        if method == 'GET' and 'text/event-stream' in request['headers'].get('accept', ''):
+            await self.stream(parts, reader, writer, session)
+            return False
+        if method == 'POST' and session and 'onDisconnect' in query:
+            operation = query['onDisconnect'][0]
+            if operation not in ('set', 'update', 'remove', 'cancel') or \
+                    (operation == 'update' and not isinstance(body, dict)):
+                return await self.respond(writer, 400, json.dumps({'error': 'Invalid onDisconnect'}),
+                                          keep_alive=keep_alive)
+            self.on_disconnect(session, operation, parts, body)
+            return await self.respond(writer, 200, 'null', keep_alive=keep_alive)
+        headers = {}
+        want_etag = request['headers'].get('x-firebase-etag', '').lower() == 'true'
+        if_match = request['headers'].get('if-match')
+        if if_match is not None and method in ('PUT', 'DELETE'):
+            # Conditional write: the check and the write happen without
+            # yielding to the event loop, so they are atomic
+            current = self.database.get(parts)
+            if etag(current) != if_match:
+                return await self.respond(writer, 412, json.dumps(current, separators=(',', ':')),
+                                          headers={'ETag': etag(current)}, keep_alive=keep_alive)
+
+        if method == 'PUT':
+            writes = [(parts, body)]
+        elif method == 'PATCH' and isinstance(body, dict):
+            writes = [(parts + split_path(key), value) for key, value in body.items()]
+        else:
+            writes = []
+        if not version_guard(self.database, writes):
+            return await self.respond(writer, 401, json.dumps({'error': 'Permission denied'}),
+                                      keep_alive=keep_alive)
+
+        if method == 'GET' and parts == ['.info', 'serverTime']:
+            # Lets firebase-local.js estimate .info/serverTimeOffset
+            result = now_ms()
+        elif method == 'GET':
+            result = self.database.get(parts)
+            params = {name: values[0] for name, values in query.items()
+                      if name in ('orderBy', 'startAt', 'endAt', 'equalTo', 'limitToFirst', 'limitToLast')}
+            try:
+                if params:
+                    result = query_children(result, params)
+            except (ValueError, TypeError):
+                return await self.respond(writer, 400, json.dumps({'error': 'Invalid query'}),
+                                          keep_alive=keep_alive)
+            if query.get('shallow', [''])[0] == 'true':
+                result = shallow(result)
+        elif method == 'PUT':
+            result = self.database.set(parts, body)
+        elif method == 'PATCH':
+            if not isinstance(body, dict):
+                return await self.respond(writer, 400, json.dumps({'error': 'PATCH needs an object'}),
+                                          keep_alive=keep_alive)
+            result = self.database.update(parts, body)
+        elif method == 'DELETE':
+            result = self.database.remove(parts)
+        else:
+            return await self.respond(writer, 405, json.dumps({'error': 'Method not allowed'}),
+                                      keep_alive=keep_alive)
+        if want_etag or if_match is not None:
+            headers['ETag'] = etag(self.database.get(parts))
+        return await self.respond(writer, 200, json.dumps(result, separators=(',', ':')),
+                                  headers=headers, keep_alive=keep_alive)
+
+    async def stream(self, parts, reader, writer, session=None):
+        """Serve an event stream until the client goes away."""
+        if session:
+            self.session_opened(session)
+        writer.write(('HTTP/1.1 200 OK\r\n'
+                      'Content-Type: text/event-stream\r\n'
+                      'Cache-Control: no-cache\r\n'
+                      'Access-Control-Allow-Origin: *\r\n'
+                      'Connection: keep-alive\r\n\r\n').encode('latin-1'))
+        subscriber = self.database.subscribe(parts)
+        # Any read completing (normally with EOF) means the client hung up
+        closed = asyncio.ensure_future(reader.read(1))
+        try:
+            while not subscriber.closed:
+                message = asyncio.ensure_future(subscriber.queue.get())
+                done, _ = await asyncio.wait({message, closed}, timeout=KEEPALIVE_SECONDS,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if closed in done:
+                    message.cancel()
+                    break
+                if message in done:
+                    writer.write(message.result().encode('utf-8'))
+                else:
+                    message.cancel()
+                    writer.write(b'event: keep-alive\ndata: null\n\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            closed.cancel()
+            self.database.unsubscribe(subscriber)
+            if session:
+                self.session_closed(session)
+
+    # onDisconnect
+
+    def session_opened(self, session_id):
+        session = self.sessions.setdefault(session_id, Session())
+        session.streams += 1
+        if session.timer:
+            session.timer.cancel()
+            session.timer = None
+
+    def session_closed(self, session_id):
+        session = self.sessions[session_id]
+        session.streams -= 1
+        if not session.streams:
+            self.schedule_disconnect(session_id)
+
+    def on_disconnect(self, session_id, operation, parts, value):
+        session = self.sessions.setdefault(session_id, Session())
+        if operation == 'cancel':
+            session.operations = [queued for queued in session.operations
+                                  if not is_prefix(parts, queued[1])]
+        else:
+            # Re-registering at a path replaces what was queued there
+            session.operations = [queued for queued in session.operations if queued[1] != parts]
+            session.operations.append((operation, parts, value))
+        if not session.streams and not session.timer:
+            # Registered before (or without) any stream: still fires
+            self.schedule_disconnect(session_id)
+
+    def schedule_disconnect(self, session_id):
+        session = self.sessions[session_id]
+        if not session.operations:
+            del self.sessions[session_id]
+            return
+        session.timer = asyncio.get_running_loop().call_later(
+            DISCONNECT_GRACE_SECONDS, self.disconnect, session_id)
+
+    def disconnect(self, session_id):
+        session = self.sessions.pop(session_id)
+        for operation, parts, value in session.operations:
+            if operation == 'set':
+                self.database.set(parts, value)
+            elif operation == 'update':
+                self.database.update(parts, value)
+            else:
+                self.database.remove(parts)
+
+    async def handle_static(self, request, path, writer, keep_alive):
+        rel = path.lstrip('/') or 'index.html'
+        if rel.endswith('/'):
+            rel += 'index.html'
+        full = os.path.abspath(os.path.join(self.static_dir, rel))
+        if not full.startswith(self.static_dir + os.sep) or not os.path.isfile(full):
+            return await self.respond(writer, 404, 'Not found', 'text/plain', keep_alive=keep_alive)
+
+        content_type = mimetypes.guess_type(full)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type == 'application/javascript':
+            content_type += '; charset=utf-8'
+        headers = {'Vary': 'Accept-Encoding'}
+        # Serve the packager's pre-compressed siblings when the client accepts them
+        accepted = request['headers'].get('accept-encoding', '')
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if encoding in accepted and os.path.isfile(full + suffix):
+                full += suffix
+                headers['Content-Encoding'] = encoding
+                break
+        with open(full, 'rb') as f:
+            body = f.read()
+        if request['method'] == 'HEAD':
+            body = b''
+        return await self.respond(writer, 200, body, content_type, headers, keep_alive)
+
+
+async def serve(host, port, static_dir=None, data=None):
+    server = RoomServer(Database(data), static_dir)
+    listener = await server.start(host, port)
+    print(f"🎮 Kaataq room server on http://{host}:{port}{DB_PREFIX}")
+    if static_dir:
+        print(f"   serving game files from {os.path.abspath(static_dir)}")
+    async with listener:
+        await listener.serve_forever()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Local Kaataq room server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--static', metavar='DIR',
+                        help='also serve the packaged game files from DIR')
+    parser.add_argument('--load', metavar='FILE',
+                        help='start from a JSON export of the database')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    data = None
+    if args.load:
+        with open(args.load, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    try:
+        asyncio.run(serve(args.host, args.port, args.static, data))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
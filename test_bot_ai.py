@@ -0,0 +1,45 @@
+# Tests for the bot strategies and round rules in bot_ai.py
+#
+#     python -m pytest test_bot_ai.py
+import random
+
+import bot_ai
+from bot_ai import LEFT, RIGHT
+
+
+def test_score_round_rewards_correct_guessers_and_a_hard_to_read_holder():
+    players = {p: {'score': 1} for p in ('h', 'a', 'b', 'c')}
+    updates, correct = bot_ai.score_round(players, {'a': LEFT, 'b': RIGHT, 'c': RIGHT}, 'h', LEFT)
+    assert correct == ['a']
+    assert updates == {'h': 2, 'a': 2}
+
+    updates, correct = bot_ai.score_round(players, {'a': LEFT, 'b': LEFT, 'c': RIGHT}, 'h', LEFT)
+    assert updates == {'a': 2, 'b': 2}
+
+
+def test_score_round_skips_players_who_left():
+    updates, _ = bot_ai.score_round({'a': {'score': 0}}, {'a': LEFT, 'gone': RIGHT}, 'holder', RIGHT)
+    assert updates == {}
+
+
+def test_votes_count_once_per_eligible_player():
+    players = [{'id': 'h'}, {'id': 'a'}, {'id': 'b', 'connected': False}, {'id': 'c'}]
+    room = {'eligibleVoters': bot_ai.eligible_voter_ids(players, players[0]), 'votes': {}, 'voteCount': 0}
+    assert room['eligibleVoters'] == {'a': True, 'c': True}
+
+    assert bot_ai.counts_vote(room, 'a')
+    assert not bot_ai.counts_vote(room, 'b')  # disconnected when voting opened
+    room['votes']['a'] = LEFT
+    room['voteCount'] = 2  # a vote counted twice
+    assert not bot_ai.counts_vote(room, 'a')
+    assert not bot_ai.all_voted(room)
+    room['votes']['c'] = RIGHT
+    assert bot_ai.all_voted(room)
+
+
+def test_pattern_stats_learn_a_holder_habit():
+    stats = bot_ai.PatternStats()
+    history = [{'round': round_number, 'holderId': 'h', 'stickChoice': LEFT} for round_number in range(6)]
+    stats.sync(history)
+    guesses = [bot_ai.make_strategic_guess({'id': 'h'}, stats, {}, random.Random(seed)) for seed in range(20)]
+    assert guesses.count(LEFT) > guesses.count(RIGHT)
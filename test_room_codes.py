@@ -0,0 +1,61 @@
+# Tests for the room code allocator
+#
+#     python -m pytest test_room_codes.py
+import asyncio
+import random
+from collections import deque
+
+from room_codes import RoomCodeAllocator
+from room_server import Database, etag, split_path
+
+
+class FakeClient:
+    """The two requests the allocator makes, against an in-memory Database."""
+
+    def __init__(self, data=None):
+        self.database = Database(data)
+
+    async def get(self, path):
+        return self.database.get(split_path(path))
+
+    async def request(self, method, path, body=None, headers=None):
+        parts = split_path(path)
+        current = self.database.get(parts)
+        if etag(current) != headers['if-match']:
+            return 412, {}, current
+        return 200, {}, self.database.set(parts, body)
+
+
+def allocate(allocator, count):
+    async def run():
+        await allocator.load()
+        return [await allocator.allocate('owner') for _ in range(count)]
+    return asyncio.run(run())
+
+
+def test_codes_are_unique_and_claimed():
+    client = FakeClient()
+    codes = allocate(RoomCodeAllocator(client, rng=random.Random(1)), 50)
+    assert len(set(codes)) == 50
+    assert all(len(code) == 4 and code[0] != '0' for code in codes)
+    assert set(client.database.get(['roomCodes'])) == set(codes)
+
+
+def test_codes_grow_once_a_length_is_half_used():
+    taken = {str(code): {'owner': 'x'} for code in range(1000, 5500)}
+    allocator = RoomCodeAllocator(FakeClient({'roomCodes': taken}), rng=random.Random(2))
+    code, = allocate(allocator, 1)
+    assert len(code) == 5
+
+
+def test_a_code_claimed_elsewhere_is_skipped():
+    client = FakeClient()
+    allocator = RoomCodeAllocator(client, rng=random.Random(3))
+    # Another creator claims codes after the allocator loaded the index
+    asyncio.run(allocator.load())
+    for code in range(1000, 1010):
+        client.database.set(['roomCodes', str(code)], {'owner': 'other'})
+    allocator.free[4] = deque(str(code) for code in range(1010, 999, -1))  # drawn from the end
+    code = asyncio.run(allocator.allocate('owner'))
+    assert code == '1010'
+    assert allocator.collisions == 10
@@ -0,0 +1,70 @@
+# Tests for the room garbage collector
+#
+#     python -m pytest test_room_gc.py
+import asyncio
+
+from room_gc import DumpStore, RoomCollector
+
+MINUTE = 60 * 1000
+NOW = 10 * 24 * 60 * MINUTE
+
+
+def player(player_id, connected=True, seen=NOW, **fields):
+    return dict({'id': player_id, 'name': player_id.upper(), 'connected': connected,
+                 'lastSeenAt': seen}, **fields)
+
+
+def room(*players, **fields):
+    return dict({'host': players[0]['id'], 'createdAt': NOW - 120 * MINUTE,
+                 'seats': [p['id'] for p in players],
+                 'players': {p['id']: p for p in players}}, **fields)
+
+
+def test_idle_room_is_deleted():
+    collector = RoomCollector(None)
+    stale = room(player('a', connected=False, seen=NOW - 90 * MINUTE))
+    assert collector.collect_room('1234', stale, NOW)
+    assert collector.metrics.rooms_deleted['idle'] == 1
+    assert collector.deletes == {'rooms/1234': None, 'roomArchive/1234': None, 'roomCodes/1234': None}
+
+
+def test_room_left_by_every_human_is_deleted():
+    collector = RoomCollector(None, idle_minutes=240)
+    left = room(player('a', connected=False, seen=NOW - 20 * MINUTE),
+                player('bot_1', isBot=True))
+    assert collector.collect_room('1234', left, NOW)
+    assert collector.metrics.rooms_deleted['empty'] == 1
+
+
+def test_live_room_is_kept():
+    collector = RoomCollector(None)
+    assert not collector.collect_room('1234', room(player('a'), player('b')), NOW)
+    assert collector.deletes == {}
+
+
+def test_departed_host_is_replaced_mid_game():
+    collector = RoomCollector(None)
+    game = room(player('a', connected=False, seen=NOW - 20 * MINUTE),
+                player('b', connected=False, seen=NOW - MINUTE), player('c'),
+                gameStarted=True)
+    assert not collector.collect_room('1234', game, NOW)
+    assert collector.metrics.players_removed == 1
+    assert collector.deletes['rooms/1234/players/a'] is None
+    # The first seated connected human, not the disconnected one ahead of it
+    assert collector.deletes['rooms/1234/host'] == 'c'
+    assert collector.deletes['rooms/1234/players/c/isHost'] is True
+    assert collector.deletes['rooms/1234/roomVersion'] == {'.sv': {'increment': 1}}
+
+
+def test_run_cleans_a_dump():
+    store = DumpStore({
+        'rooms': {'1234': room(player('a', connected=False, seen=NOW - 90 * MINUTE)),
+                  '5678': room(player('b'))},
+        'roomCodes': {'1234': {'claimedAt': 0}, '5678': {'claimedAt': 0}, '9999': {'claimedAt': 0}},
+        'roomArchive': {'4321': {'gameHistory': [{'round': 1}]}},
+    })
+    metrics = asyncio.run(RoomCollector(store).run(now=NOW))
+    assert metrics.rooms_deleted['idle'] == 1
+    assert metrics.codes_freed == 1 and metrics.archives_freed == 1
+    assert store.database.get([]) == {'rooms': {'5678': room(player('b'))},
+                                      'roomCodes': {'5678': {'claimedAt': 0}}}
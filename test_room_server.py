@@ -0,0 +1,40 @@
+# Tests for the in-memory database behind room_server.py
+#
+#     python -m pytest test_room_server.py
+from room_server import Database, etag, version_guard
+
+INCREMENT = {'.sv': {'increment': 1}}
+
+
+def test_arrays_are_stored_as_objects_and_exported_as_arrays():
+    database = Database({'rooms': {'1234': {'seats': ['a', 'b']}}})
+    assert database.root['rooms']['1234']['seats'] == {'0': 'a', '1': 'b'}
+    assert database.get(['rooms', '1234', 'seats']) == ['a', 'b']
+
+
+def test_etag_covers_the_exported_value():
+    database = Database({'seats': ['a', 'b']})
+    assert etag(database.get(['seats'])) == etag(['a', 'b'])
+    assert etag(database.get(['seats'])) != etag({'0': 'a', '1': 'b'})
+    assert etag(None) == 'null_etag'
+
+
+def test_update_resolves_increment_and_deletes():
+    database = Database({'rooms': {'1234': {'voteCount': 2, 'stickChoice': 'left'}}})
+    database.update(['rooms', '1234'], {'voteCount': INCREMENT, 'stickChoice': None,
+                                        'votes/a': 'right'})
+    assert database.get(['rooms', '1234']) == {'voteCount': 3, 'votes': {'a': 'right'}}
+    database.update([], {'rooms/1234/missing': INCREMENT})
+    assert database.get(['rooms', '1234', 'missing']) == 1
+
+
+def test_version_guard_lets_roomversion_move_up_by_one():
+    database = Database({'rooms': {'1234': {'roomVersion': 4}}})
+    assert version_guard(database, [(['rooms', '1234', 'roomVersion'], 5)])
+    assert version_guard(database, [(['rooms', '1234', 'roomVersion'], INCREMENT)])
+    assert version_guard(database, [(['rooms', '1234', 'host'], 'b')])
+    assert not version_guard(database, [(['rooms', '1234', 'roomVersion'], 4)])
+    # Written as part of a bigger value, as a room transaction does
+    assert not version_guard(database, [(['rooms'], {'1234': {'roomVersion': 7}})])
+    # A new room may start anywhere
+    assert version_guard(database, [(['rooms', '5678', 'roomVersion'], 0)])
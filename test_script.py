@@ -0,0 +1,125 @@
+# Tests for script.py: the minifiers, templates, checks and build output
+#
+#     python -m pytest test_script.py
+import json
+import os
+
+import pytest
+
+from script import (MANIFEST_NAME, Template, build, check_files, fingerprint_stage,
+                    load_variants, minify_css, minify_html, minify_js, source_files)
+
+
+def test_minify_js_regex_after_keyword():
+    source = "function f(s) { return /'/.test(s); }\nconst u = 'http://example.com';"
+    assert minify_js(source) == "function f(s){return/'/.test(s);}\nconst u='http://example.com';"
+    assert minify_js("const t = typeof /x/;") == "const t=typeof/x/;"
+
+
+def test_minify_js_division_after_identifier_ending_in_keyword():
+    # 'margin' ends in 'in' and 'radio' in 'do'; neither starts a regex
+    assert minify_js("const w = margin / 2 / radio;") == "const w=margin / 2 / radio;"
+
+
+def test_minify_js_keeps_literals():
+    source = "const a = \"// not a comment\"; const b = `x ${ y / 2 } /* z */`;"
+    assert minify_js(source) == "const a=\"// not a comment\";const b=`x ${ y / 2 } /* z */`;"
+
+
+def test_minify_js_strips_comments():
+    source = "// header\nlet a = 1; /* note */\nlet b = [a, /[/]/g];\n"
+    assert minify_js(source) == "let a=1;let b=[a,/[/]/g];"
+
+
+def test_minify_js_keeps_line_breaks_for_asi():
+    assert minify_js("let a = 1\nlet b = a\n+b") == "let a=1\nlet b=a\n+b"
+
+
+def test_minify_css():
+    source = "/* theme */\n.a ,\n.b > .c {\n  color: red;\n  font-family: 'Open  Sans';\n}\n"
+    assert minify_css(source) == ".a,.b>.c{color:red;font-family:'Open  Sans'}"
+
+
+def test_minify_html():
+    source = ("<!-- note -->\n<div>\n  <p>Hi   there</p>\n</div>\n"
+              "<pre>  keep\n  this</pre>\n<script>\n  // setup\n  const a = 1;\n</script>\n"
+              "<style>\n  .a { color: red; }\n</style>")
+    assert minify_html(source) == ("<div> <p>Hi there</p> </div> <pre>  keep\n  this</pre> "
+                                   "<script>const a=1;</script> <style>.a{color:red}</style>")
+
+
+def test_minify_html_keeps_external_script_body():
+    source = '<script src="game.js">  </script>'
+    assert minify_html(source) == source
+
+
+def test_template_render_fills_named_slots():
+    template = Template.compile("this.config = {\n    maxPlayers: 8, // most\n    mode: 'delta'\n};")
+    assert template.names == {'config.maxPlayers', 'config.mode'}
+    assert template.render() == "this.config = {\n    maxPlayers: 8, // most\n    mode: 'delta'\n};"
+    assert template.render({'config.maxPlayers': 12}) == \
+        "this.config = {\n    maxPlayers: 12, // most\n    mode: 'delta'\n};"
+
+
+def test_source_files_rejects_unknown_param():
+    with pytest.raises(ValueError, match='config.noSuchOption'):
+        source_files({'config.noSuchOption': 1})
+
+
+def test_build_incremental_skips_unchanged(tmp_path):
+    out = str(tmp_path / 'dist')
+    files = {'index.html': '<p>hi</p>', 'game.js': 'let a=1;'}
+    first = build(files, out, incremental=True)
+    assert sorted(first['written']) == ['game.js', 'index.html']
+
+    second = build(dict(files, **{'game.js': 'let a=2;'}), out, incremental=True)
+    assert second['written'] == ['game.js']
+    assert second['skipped'] == ['index.html']
+    with open(os.path.join(out, MANIFEST_NAME), encoding='utf-8') as f:
+        assert sorted(json.load(f)['files']) == ['game.js', 'index.html']
+
+    third = build({'index.html': '<p>hi</p>'}, out, incremental=True)
+    assert third['skipped'] == ['index.html']
+    assert third['stale'] == ['game.js']
+
+
+def test_fingerprint_stage_rewrites_html():
+    files = {'index.html': '<link rel="stylesheet" href="styles.css"><script src="game.js"></script>',
+             'styles.css': 'p{}', 'game.js': 'let a=1;'}
+    out, mapping = fingerprint_stage(files)
+    assert mapping['game.js'].startswith('game.') and mapping['game.js'].endswith('.js')
+    assert out[mapping['game.js']] == 'let a=1;'
+    assert 'game.js' not in out
+    assert out['index.html'] == (f'<link rel="stylesheet" href="{mapping["styles.css"]}">'
+                                 f'<script src="{mapping["game.js"]}"></script>')
+    assert json.loads(out['asset-manifest.json']) == mapping
+
+
+def test_check_files_reports_missing_id():
+    files = {'index.html': '<div id="lobby"></div>',
+             'game.js': "document.getElementById('lobby');\ndocument.getElementById('lobbby');"}
+    errors, _ = check_files(files)
+    assert errors == ["game.js:2 getElementById('lobbby'): no element has id lobbby"]
+
+
+def write_variants(tmp_path, variants):
+    path = tmp_path / 'variants.json'
+    path.write_text(json.dumps({'out': str(tmp_path / 'dist'), 'variants': variants}))
+    return str(path)
+
+
+def test_load_variants_resolves_out_dirs(tmp_path):
+    path = write_variants(tmp_path, {'default': {}, 'party': {'options': {'offline': False}}})
+    variants, root = load_variants(path, {'out': 'dist', 'offline': True})
+    assert [(name, out_dir) for name, _, _, out_dir in variants] == \
+        [('default', os.path.join(root, 'default')), ('party', os.path.join(root, 'party'))]
+    assert variants[0][2]['offline'] is True and variants[1][2]['offline'] is False
+
+
+@pytest.mark.parametrize('variants', [
+    {'../up': {}},
+    {'default': {}, 'dup': {'out': 'default'}},
+])
+def test_load_variants_rejects_bad_out_dirs(tmp_path, variants):
+    with pytest.raises(ValueError):
+        load_variants(write_variants(tmp_path, variants), {'out': 'dist'})